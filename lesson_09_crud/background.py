@@ -0,0 +1,48 @@
+"""
+BACKGROUND TASKS
+=================
+A tiny helper for jobs that run every N seconds inside the API process.
+
+Each task gets its own daemon thread, so a slow job never blocks
+requests or other jobs. Tasks are started and stopped from the app's
+lifespan in main.py.
+"""
+
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Run `func` every `interval` seconds on a background thread."""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        # Event.wait returns True once stop() is called, ending the loop
+        while not self._stop.wait(self.interval):
+            try:
+                self.func()
+            except Exception:
+                # Keep the thread alive; the next tick may well succeed
+                logger.exception("Background task %s failed", self.name)
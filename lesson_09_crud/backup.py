@@ -0,0 +1,182 @@
+"""
+ONLINE BACKUPS
+===============
+Copies items.db while the API keeps running, using SQLite's online
+backup API.
+
+Copying the file with `cp` while requests are writing can produce a
+torn, corrupt copy. The backup API copies the database page by page
+through a normal connection instead. It copies BACKUP_PAGES_PER_STEP
+pages, lets go of the database for BACKUP_STEP_SLEEP seconds so writers
+can get in, and carries on. If a write lands on an already-copied page,
+SQLite restarts the copy, so the result is always consistent.
+
+Each backup:
+1. Is written to backups/items-<UTC time>.db.tmp
+2. Is checked with PRAGMA integrity_check
+3. Is renamed to .db (so a half-written file never looks finished)
+4. Prunes old backups down to the newest BACKUP_KEEP
+
+Backups run every BACKUP_INTERVAL_SECONDS in the background, or on
+demand:
+
+    POST /admin/backup   -> 202, starts one (409 if one is running)
+    GET  /admin/backup   -> progress of the current or last backup
+
+Restore by stopping the app and copying a backup over items.db.
+Tenant databases (see tenants.py) are not included.
+"""
+
+import glob
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from background import PeriodicTask
+from database import engine
+from metrics import Counter, Gauge
+
+BACKUP_DIR = "./backups"
+
+# Pages copied per step (SQLite pages are 4 KB by default)
+BACKUP_PAGES_PER_STEP = 256
+
+# Pause between steps, when the database is free for writers
+BACKUP_STEP_SLEEP = 0.005
+
+# Number of backups kept
+BACKUP_KEEP = 7
+
+# How often the background backup runs (0 disables it)
+BACKUP_INTERVAL_SECONDS = 24 * 60 * 60
+
+backups_total = Counter("db_backups_total", "Finished backups, by result", ["result"])
+backup_last_success = Gauge(
+    "db_backup_last_success_timestamp_seconds", "Unix time the last good backup finished"
+)
+
+
+class BackupStatus:
+    """Progress of the current (or last) backup, shared with GET /admin/backup."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, state: str = "idle"):
+        self.state = state  # idle, running, succeeded or failed
+        self.path = None
+        self.pages_total = 0
+        self.pages_remaining = 0
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+
+    def as_dict(self) -> dict:
+        copied = self.pages_total - self.pages_remaining
+        return {
+            "state": self.state,
+            "path": self.path,
+            "pages_total": self.pages_total,
+            "pages_copied": copied,
+            "progress": round(copied / self.pages_total, 3) if self.pages_total else 0.0,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+
+
+current = BackupStatus()
+
+# Held for the whole of a backup, so only one runs at a time
+_running = threading.Lock()
+
+
+def _database_name() -> str:
+    return os.path.splitext(os.path.basename(engine.url.database))[0]
+
+
+def _prune(keep: int):
+    backups = sorted(glob.glob(os.path.join(BACKUP_DIR, f"{_database_name()}-*.db")))
+    for path in backups[:-keep] if keep > 0 else []:
+        os.remove(path)
+
+
+def _backup():
+    # Caller holds _running
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(BACKUP_DIR, f"{_database_name()}-{stamp}.db")
+    temp_path = path + ".tmp"
+
+    current.reset("running")
+    current.path = path
+    current.started_at = datetime.now(timezone.utc)
+
+    def progress(_, remaining, total):
+        current.pages_remaining = remaining
+        current.pages_total = total
+
+    try:
+        target = sqlite3.connect(temp_path)
+        try:
+            # Borrow a pooled connection as the source
+            with engine.connect() as conn:
+                conn.connection.driver_connection.backup(
+                    target, pages=BACKUP_PAGES_PER_STEP, progress=progress, sleep=BACKUP_STEP_SLEEP
+                )
+            check = target.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            target.close()
+
+        if check != [("ok",)]:
+            raise RuntimeError(f"Integrity check failed: {check[:5]}")
+
+        os.replace(temp_path, path)
+        _prune(BACKUP_KEEP)
+    except Exception as exc:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        current.state = "failed"
+        current.error = str(exc)
+        backups_total.inc(result="failed")
+        raise
+    finally:
+        current.finished_at = datetime.now(timezone.utc)
+
+    current.state = "succeeded"
+    backups_total.inc(result="succeeded")
+    backup_last_success.set(time.time())
+
+
+def run_backup() -> dict:
+    """Take a backup now, unless one is already running. Used by the scheduler."""
+    if not _running.acquire(blocking=False):
+        return current.as_dict()
+    try:
+        _backup()
+    finally:
+        _running.release()
+    return current.as_dict()
+
+
+def start_backup() -> bool:
+    """Start a backup on a background thread; False if one is already running."""
+    if not _running.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            _backup()
+        except Exception:
+            pass  # Recorded in `current` and metrics
+        finally:
+            _running.release()
+
+    current.reset("running")
+    threading.Thread(target=run, name="backup", daemon=True).start()
+    return True
+
+
+backup_task = PeriodicTask("backup", BACKUP_INTERVAL_SECONDS, run_backup)
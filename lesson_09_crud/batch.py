@@ -0,0 +1,264 @@
+"""
+BATCH REQUESTS
+===============
+Runs many item operations in one HTTP request and one transaction.
+
+A client that creates 50 items makes 50 round trips and 50 commits -
+and each SQLite commit waits for the disk. POST /batch takes the same
+operations as a list and commits once:
+
+    POST /batch
+    {
+      "mode": "atomic",
+      "operations": [
+        {"method": "POST", "path": "/items", "body": {"name": "Mouse", "price": 25}},
+        {"method": "PUT", "path": "/items/3", "body": {"quantity": 0}},
+        {"method": "DELETE", "path": "/items/7"}
+      ]
+    }
+
+Every operation is routed to the real endpoint function (create_item,
+update_item, ...), so it is validated and handled exactly like a single
+request, against the same tenant (X-Tenant header). The differences:
+- The endpoint's db.commit() just flushes; the batch commits once at
+  the end.
+- Autocomplete updates are held back until that commit, then the
+  touched items are re-read, so suggestions never show an item from a
+  rolled-back operation.
+
+Modes:
+- atomic (default): all or nothing. The first failing operation rolls
+  everything back; it is reported as "failed", the ones before it as
+  "rolled_back" and the rest as "skipped".
+- best_effort: each operation runs in its own SAVEPOINT. A failing one
+  is rolled back on its own and the others are committed.
+
+Each result carries the status code and body the endpoint would have
+returned on its own. Only the single-item endpoints in BATCH_ROUTES can
+be batched, and at most 100 operations per request.
+"""
+
+import inspect
+import json
+from functools import lru_cache
+from typing import Annotated, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from fastapi import FastAPI, HTTPException, Response, params, status
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic.fields import FieldInfo
+
+from sqlalchemy import select
+
+from metrics import Counter, Histogram
+from models import Item
+from schemas import BatchOperation, BatchRequest, BatchResponse, BatchResult
+from tenants import Tenant
+
+# (method, route path) of the endpoints a batch may call. They act on
+# one item and only touch the database through the session they are
+# given, so they can share the batch's transaction.
+BATCH_ROUTES = {
+    ("POST", "/items"),
+    ("GET", "/items/{item_id}"),
+    ("PUT", "/items/{item_id}"),
+    ("DELETE", "/items/{item_id}"),
+}
+
+batch_requests = Counter("batch_requests_total", "Batch requests, by mode and outcome", ["mode", "result"])
+batch_size = Histogram(
+    "batch_operations", "Operations per batch request", buckets=(1, 5, 10, 25, 50, 100)
+)
+
+
+class BatchSession:
+    """The request's session, except that commit() only flushes."""
+
+    def __init__(self, db):
+        self._db = db
+
+    def commit(self):
+        self._db.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+class SuggestRecorder:
+    """Stands in for a tenant's suggest index and notes the items changed."""
+
+    def __init__(self):
+        self.item_ids = set()
+
+    def upsert(self, item_id: int, *args):
+        self.item_ids.add(item_id)
+
+    def remove(self, item_id: int):
+        self.item_ids.add(item_id)
+
+
+def _refresh_suggestions(db, index, item_ids):
+    # Re-read instead of replaying the calls: an operation that was
+    # rolled back must not show up
+    items = db.scalars(select(Item).where(Item.id.in_(item_ids))).all()
+    for item in items:
+        index.upsert(item.id, item.name, item.is_available, item.quantity)
+    for item_id in item_ids - {item.id for item in items}:
+        index.remove(item_id)
+
+
+# ============================================
+# Routing one operation
+# ============================================
+
+def _error(status_code: int, detail) -> HTTPException:
+    return HTTPException(status_code=status_code, detail=detail)
+
+
+def resolve(app: FastAPI, method: str, path: str) -> Tuple[APIRoute, Dict[str, str]]:
+    """Find the route FastAPI would call; returns it and its path params."""
+    method = method.upper()
+    path_matched = False
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        match = route.path_regex.match(path)
+        if match is None:
+            continue
+        if method not in route.methods:
+            path_matched = True
+            continue
+        if (method, route.path) not in BATCH_ROUTES:
+            raise _error(status.HTTP_400_BAD_REQUEST, f"{method} {route.path} can't be used in a batch")
+        return route, match.groupdict()
+
+    if path_matched:
+        raise _error(status.HTTP_405_METHOD_NOT_ALLOWED, "Method Not Allowed")
+    raise _error(status.HTTP_404_NOT_FOUND, "Not Found")
+
+
+@lru_cache(maxsize=None)
+def _adapter(annotation) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def _arguments(route: APIRoute, path_params: Dict[str, str], query: Dict[str, str],
+               body: Optional[dict], context: dict) -> dict:
+    """Build the endpoint's keyword arguments from one operation."""
+    kwargs = {}
+    for name, param in inspect.signature(route.endpoint).parameters.items():
+        annotation = param.annotation
+        default = param.default
+
+        if name in context:
+            kwargs[name] = context[name]
+        elif name in path_params:
+            kwargs[name] = _adapter(annotation).validate_python(path_params[name])
+        elif inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+            kwargs[name] = annotation.model_validate(body or {})
+        elif isinstance(default, params.Header):
+            # Headers aren't part of an operation
+            kwargs[name] = default.get_default()
+        elif name in query:
+            # Query(...) constraints such as ge/le still apply
+            if isinstance(default, FieldInfo):
+                annotation = Annotated[annotation, default]
+            kwargs[name] = _adapter(annotation).validate_python(query[name])
+        elif isinstance(default, FieldInfo):
+            kwargs[name] = default.get_default()
+        elif default is not inspect.Parameter.empty:
+            kwargs[name] = default
+        else:
+            raise _error(status.HTTP_422_UNPROCESSABLE_CONTENT, f"Missing parameter: {name}")
+    return kwargs
+
+
+def call(app: FastAPI, operation: BatchOperation, context: dict) -> Tuple[int, object]:
+    """Run one operation through its endpoint; returns (status code, body)."""
+    url = urlsplit(operation.path)
+    route, path_params = resolve(app, operation.method, url.path)
+    query = dict(parse_qsl(url.query))
+
+    try:
+        result = route.endpoint(**_arguments(route, path_params, query, operation.body, context))
+    except ValidationError as exc:
+        raise _error(status.HTTP_422_UNPROCESSABLE_CONTENT, json.loads(exc.json(include_url=False)))
+
+    if isinstance(result, Response):
+        return result.status_code, json.loads(result.body) if result.body else None
+
+    body = result
+    if route.response_model is not None and result is not None:
+        adapter = _adapter(route.response_model)
+        body = adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+    return route.status_code or status.HTTP_200_OK, body
+
+
+# ============================================
+# Running a batch
+# ============================================
+
+def _begin(db):
+    # pysqlite only sends BEGIN before the first write. A SAVEPOINT
+    # outside a transaction opens one of its own, which its RELEASE then
+    # commits, so make sure the outer transaction is open first.
+    connection = db.connection().connection.driver_connection
+    if not connection.in_transaction:
+        connection.execute("BEGIN")
+
+
+def _run_one(app: FastAPI, index: int, operation: BatchOperation, context: dict) -> BatchResult:
+    try:
+        code, body = call(app, operation, context)
+    except HTTPException as exc:
+        return BatchResult(index=index, outcome="failed", status=exc.status_code, body={"detail": exc.detail})
+    return BatchResult(index=index, outcome="ok", status=code, body=body)
+
+
+def execute(app: FastAPI, db, request: BatchRequest, tenant: Tenant) -> BatchResponse:
+    """
+    Run every operation of `request` on the tenant session `db` and commit.
+
+    Errors other than HTTP errors propagate, and the caller's session
+    cleanup rolls the whole batch back.
+    """
+    recorder = SuggestRecorder()
+    context = {
+        "db": BatchSession(db),
+        "tenant": Tenant(tenant.name, tenant.engine, tenant.SessionLocal, recorder)
+    }
+    operations = request.operations
+    results: List[BatchResult] = []
+    batch_size.observe(len(operations))
+
+    if request.mode == "atomic":
+        for index, operation in enumerate(operations):
+            result = _run_one(app, index, operation, context)
+            results.append(result)
+            if result.outcome == "failed":
+                db.rollback()
+                for earlier in results[:-1]:
+                    earlier.outcome = "rolled_back"
+                results.extend(
+                    BatchResult(index=skipped, outcome="skipped")
+                    for skipped in range(index + 1, len(operations))
+                )
+                batch_requests.inc(mode=request.mode, result="rolled_back")
+                return BatchResponse(mode=request.mode, committed=False, results=results)
+    else:
+        _begin(db)
+        for index, operation in enumerate(operations):
+            savepoint = db.begin_nested()
+            result = _run_one(app, index, operation, context)
+            if result.outcome == "failed":
+                savepoint.rollback()
+            else:
+                savepoint.commit()
+            results.append(result)
+
+    db.commit()
+    if recorder.item_ids:
+        _refresh_suggestions(db, tenant.suggest, recorder.item_ids)
+    batch_requests.inc(mode=request.mode, result="committed")
+    return BatchResponse(mode=request.mode, committed=True, results=results)
@@ -0,0 +1,112 @@
+"""
+RESERVATION CONTENTION BENCHMARK
+=================================
+Many threads buying the same item at once, three ways:
+
+    read-modify-write  GET the quantity, subtract, PUT it back (the old way)
+    conditional        one UPDATE ... WHERE quantity >= n per transaction
+    group commit       conditional UPDATEs, many per transaction (reservations.py)
+
+Each run starts with STOCK units and THREADS x PER_THREAD buyers, so the
+item sells out. "sold" counts the reservations that succeeded; it must
+equal the units that left stock, or the item was oversold.
+
+Runs against a throwaway database in a temporary directory.
+
+To run:
+    python bench_reserve.py
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+
+import reservations
+from database import Base, make_engine
+from models import Item
+
+THREADS = 32
+PER_THREAD = 100
+STOCK = THREADS * PER_THREAD * 3 // 4  # A quarter of buyers go away empty-handed
+
+
+def read_modify_write(session_factory, item_id: int) -> bool:
+    with session_factory() as db:
+        quantity = db.get(Item, item_id).quantity
+    if quantity < 1:
+        return False
+    with session_factory() as db:
+        db.get(Item, item_id).quantity = quantity - 1
+        db.commit()
+    return True
+
+
+def conditional(session_factory, item_id: int) -> bool:
+    with session_factory() as db:
+        try:
+            reservations.reserve(db, item_id, 1)
+        except HTTPException:
+            return False
+        db.commit()
+    return True
+
+
+def group_commit(queue, item_id: int) -> bool:
+    try:
+        queue.submit([(item_id, 1)])
+    except HTTPException:
+        return False
+    return True
+
+
+def run(label: str, reserve, target, session_factory):
+    with session_factory() as db:
+        item = Item(name="Concert ticket", price=50, quantity=STOCK)
+        db.add(item)
+        db.commit()
+        item_id = item.id
+
+    sold = [0] * THREADS
+
+    def buyer(n):
+        for _ in range(PER_THREAD):
+            if reserve(target, item_id):
+                sold[n] += 1
+
+    threads = [threading.Thread(target=buyer, args=(n,)) for n in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    with session_factory() as db:
+        left = db.get(Item, item_id).quantity
+    attempts = THREADS * PER_THREAD
+    oversold = sum(sold) - (STOCK - left)
+    print(
+        f"  {label:<18} {attempts / seconds:8.0f} req/s   sold {sum(sold):5}   "
+        f"stock {STOCK} -> {left:<5} oversold {oversold}"
+    )
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench_reserve.db')}", pool_size=THREADS
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+        print(f"{THREADS} threads x {PER_THREAD} reservations of 1 unit, {STOCK} in stock\n")
+        run("read-modify-write", read_modify_write, session_factory, session_factory)
+        run("conditional", conditional, session_factory, session_factory)
+        run("group commit", group_commit, reservations.ReservationQueue(session_factory), session_factory)
+        groups = reservations.reservation_group_size
+        print(f"\nGroup commit: {groups.count()} transactions, {groups.total() / groups.count():.1f} orders each")
+        engine.dispose()
@@ -0,0 +1,147 @@
+"""
+PRICE SEARCH BENCHMARK
+=======================
+Times GET /items/search/ price-range queries on a large catalog, with
+and without the price indexes from models.py.
+
+Builds a throwaway database in a temporary directory (items.db is
+untouched), so the first run spends a little while inserting rows.
+
+To run:
+    python bench_search.py              # 2,000,000 items
+    python bench_search.py 500000       # a smaller catalog
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import keyset
+from database import Base
+from models import Item
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+REPEAT = 20
+PAGE = 50
+
+# Same columns and orders as main.py
+SORT_COLUMNS = {"id": Item.id, "name": Item.name, "price": Item.price, "created_at": Item.created_at}
+SORTS = ["name", "created_at", "price,name"]
+
+PRICE_INDEXES = [
+    index for index in Item.__table__.indexes
+    if index.name in ("ix_items_price_name", "ix_items_available_price_name")
+]
+
+
+def build(path: str):
+    """Fill a new database, without the price indexes for now."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    for index in PRICE_INDEXES:
+        index.drop(engine)
+
+    rng = random.Random(42)
+    rows = (
+        (f"Item {i}", round(rng.uniform(1, 10_000), 2), rng.randint(0, 50), rng.random() < 0.7)
+        for i in range(ROWS)
+    )
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO items (name, price, quantity, is_available) VALUES (?, ?, ?, ?)", rows
+        )
+    conn.execute("ANALYZE")
+    conn.close()
+    return engine
+
+
+# ============================================
+# The queries
+# ============================================
+
+def search_by_id(min_price, max_price, available_only=False, skip=0):
+    """The old query: filter, then page in id order."""
+    stmt = select(Item).where(Item.price >= min_price, Item.price <= max_price)
+    if available_only:
+        stmt = stmt.where(Item.is_available == True)
+    return stmt.order_by(Item.id).offset(skip).limit(PAGE)
+
+
+def search_by_price(min_price, max_price, available_only=False, skip=0, cursor=None):
+    """The new query: page through the price range in index order."""
+    keys = keyset.parse_sort("price,name", SORT_COLUMNS, SORTS)
+    stmt = select(Item)
+    if available_only:
+        stmt = stmt.where(Item.is_available == True)
+    stmt = stmt.where(Item.price >= min_price, Item.price <= max_price)
+    return keyset.paginate(stmt, keys, cursor).offset(skip).limit(PAGE)
+
+
+def deep_cursor(db, min_price, max_price, pages):
+    """Cursor for page `pages`, fetched the way a client would."""
+    keys = keyset.parse_sort("price,name", SORT_COLUMNS, SORTS)
+    cursor = None
+    for _ in range(pages):
+        items = db.scalars(search_by_price(min_price, max_price, cursor=cursor)).all()
+        cursor = keyset.encode_cursor(items[-1], keys)
+    return cursor
+
+
+def plan(db, stmt) -> str:
+    compiled = stmt.compile(db.bind, compile_kwargs={"literal_binds": True})
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return "; ".join(row[-1] for row in rows)
+
+
+def bench(db, label, stmt):
+    db.scalars(stmt).all()  # Warm up the page cache
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        db.expunge_all()
+        db.scalars(stmt).all()
+    ms = (time.perf_counter() - start) / REPEAT * 1000
+    print(f"  {label:<44} {ms:9.2f} ms   {plan(db, stmt)}")
+
+
+def run(db):
+    bench(db, "narrow range 100-110, by id", search_by_id(100, 110))
+    bench(db, "narrow range 100-110, by price", search_by_price(100, 110))
+    bench(db, "narrow range + available_only, by id", search_by_id(100, 110, True))
+    bench(db, "narrow range + available_only, by price", search_by_price(100, 110, True))
+    bench(db, "wide range 1-5000, by id", search_by_id(1, 5000))
+    bench(db, "wide range 1-5000, by price", search_by_price(1, 5000))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_items.db")
+        print(f"Building {ROWS:,} items ...")
+        start = time.perf_counter()
+        engine = build(path)
+        print(f"  done in {time.perf_counter() - start:.1f}s\n")
+
+        with Session(engine) as db:
+            print("Without price indexes:")
+            run(db)
+
+        for index in PRICE_INDEXES:
+            index.create(engine)
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+        with Session(engine) as db:
+            print("\nWith price indexes:")
+            run(db)
+
+            print("\nPage 200 of the wide range:")
+            bench(db, "skip=9950", search_by_price(1, 5000, skip=199 * PAGE))
+            cursor = deep_cursor(db, 1, 5000, 199)
+            bench(db, "cursor", search_by_price(1, 5000, cursor=cursor))
+        engine.dispose()
@@ -0,0 +1,331 @@
+"""
+COLUMNAR ITEM SNAPSHOT
+=======================
+Price and stock reports served from NumPy arrays instead of SQLite.
+
+A price histogram or inventory value over the whole catalog has to read
+every row. Doing that in SQL on every request scans the items table
+again and again. Instead, each tenant keeps an in-memory copy of just
+the columns the reports need:
+
+    ids           int64    sorted
+    price         float64
+    quantity      int64
+    is_available  bool
+
+and answers with vectorized NumPy operations (np.histogram,
+np.percentile, masked sums), which take milliseconds even for millions
+of items.
+
+Keeping it fresh
+----------------
+The first report loads all rows once. After that a background task
+re-reads only rows whose updated_at is at least the newest value it has
+seen (minus a small overlap, since timestamps have one-second
+resolution), using the ix_items_updated_at index. Deletes leave no
+updated_at behind, so the refresh also compares the item count (one
+row read from item_stats.py's counters) and drops ids that are gone
+when they differ.
+
+Each refresh builds new arrays and swaps them in, so a report always
+sees one consistent snapshot, at most SNAPSHOT_REFRESH_SECONDS old.
+
+NumPy is optional: without it these endpoints return 503 and the rest of
+the API works as before.
+    pip install numpy
+"""
+
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, func, select, type_coerce
+
+import item_stats
+import reprice
+from background import PeriodicTask
+from metrics import Counter, Histogram
+from models import Item
+from tenants import Tenant
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Reports answer 503 (see require_numpy)
+
+# How often open snapshots pick up changes (0 disables it)
+SNAPSHOT_REFRESH_SECONDS = 5
+
+# Rows changed this close to the newest seen timestamp are re-read
+SNAPSHOT_OVERLAP = "-2 seconds"
+
+snapshot_refreshes = Counter(
+    "item_snapshot_refreshes_total", "Columnar snapshot refreshes, by kind", ["kind"]
+)
+snapshot_refresh_duration = Histogram(
+    "item_snapshot_refresh_seconds", "Time spent refreshing columnar snapshots"
+)
+
+# updated_at as the text SQLite stored, so comparisons stay text-to-text
+_updated_at = type_coerce(Item.updated_at, String)
+
+COLUMNS = select(
+    Item.id,
+    Item.price,
+    func.coalesce(Item.quantity, 0),
+    func.coalesce(Item.is_available, False),
+    _updated_at
+)
+
+
+def require_numpy():
+    if np is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analytics need NumPy (pip install numpy)"
+        )
+
+
+class Columns:
+    """One version of the arrays; never modified once published."""
+
+    def __init__(self, ids, price, quantity, available, as_of: datetime):
+        self.ids = ids
+        self.price = price
+        self.quantity = quantity
+        self.available = available
+        self.as_of = as_of
+        self._cache = {}  # Derived arrays and results, per version
+
+    def __len__(self):
+        return len(self.ids)
+
+    def sorted_prices(self, available_only: bool):
+        """Prices in ascending order, sorted once per snapshot version."""
+        key = ("sorted_prices", available_only)
+        if key not in self._cache:
+            prices = self.price[self.available] if available_only else self.price
+            self._cache[key] = np.sort(prices)
+        return self._cache[key]
+
+
+def _to_arrays(rows):
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    price = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    quantity = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+    available = np.fromiter((row[3] for row in rows), dtype=bool, count=len(rows))
+    return ids, price, quantity, available
+
+
+class ItemSnapshot:
+    """Columnar copy of one tenant's items table."""
+
+    def __init__(self, session_factory):
+        self._session_factory = session_factory
+        self._lock = threading.Lock()  # One refresh at a time
+        self._watermark: Optional[str] = None  # Newest updated_at seen
+        self.columns: Optional[Columns] = None
+
+    def get(self) -> Columns:
+        """The current arrays, loading them on first use."""
+        if self.columns is None:
+            self.refresh()
+        return self.columns
+
+    def refresh(self):
+        with self._lock:
+            start = time.perf_counter()
+            with self._session_factory() as db:
+                if self.columns is None:
+                    self._load(db)
+                else:
+                    self._apply_changes(db)
+            snapshot_refresh_duration.observe(time.perf_counter() - start)
+
+    def _load(self, db):
+        rows = db.execute(COLUMNS.order_by(Item.id)).all()
+        self._watermark = max((row[4] for row in rows if row[4] is not None), default=None)
+        self.columns = Columns(*_to_arrays(rows), as_of=datetime.now(timezone.utc))
+        snapshot_refreshes.inc(kind="full")
+
+    def _apply_changes(self, db):
+        old = self.columns
+        stmt = COLUMNS
+        if self._watermark is not None:
+            stmt = stmt.where(_updated_at >= func.datetime(self._watermark, SNAPSHOT_OVERLAP))
+        rows = db.execute(stmt).all()
+        ids, price, quantity, available = old.ids, old.price, old.quantity, old.available
+
+        stamps = [row[4] for row in rows if row[4] is not None]
+        if stamps:
+            self._watermark = max(stamps + [self._watermark or ""])
+
+        changed = False
+        if rows:
+            new_ids, new_price, new_quantity, new_available = _to_arrays(rows)
+
+            pos = np.searchsorted(ids, new_ids)
+            known = pos < len(ids)
+            known[known] = ids[pos[known]] == new_ids[known]
+            added = ~known
+            at = pos[known]
+            # The overlap re-reads some rows every time; skip those that match
+            changed = bool(
+                added.any()
+                or (price[at] != new_price[known]).any()
+                or (quantity[at] != new_quantity[known]).any()
+                or (available[at] != new_available[known]).any()
+            )
+
+        if changed:
+            # Rows already in the snapshot are updated in place (on copies)
+            price, quantity, available = price.copy(), quantity.copy(), available.copy()
+            price[at] = new_price[known]
+            quantity[at] = new_quantity[known]
+            available[at] = new_available[known]
+
+            # New rows are appended, then everything re-sorted by id if needed
+            if added.any():
+                ids = np.concatenate([ids, new_ids[added]])
+                price = np.concatenate([price, new_price[added]])
+                quantity = np.concatenate([quantity, new_quantity[added]])
+                available = np.concatenate([available, new_available[added]])
+                if len(ids) > 1 and not (ids[1:] > ids[:-1]).all():
+                    order = np.argsort(ids, kind="stable")
+                    ids, price = ids[order], price[order]
+                    quantity, available = quantity[order], available[order]
+
+        # Deletes don't show up in updated_at; a count mismatch gives them away
+        if item_stats.read(db)["total_items"] != len(ids):
+            present = np.fromiter(db.scalars(select(Item.id)), dtype=np.int64)
+            keep = np.isin(ids, present)
+            ids, price, quantity, available = ids[keep], price[keep], quantity[keep], available[keep]
+            snapshot_refreshes.inc(kind="deletes")
+            changed = True
+
+        if not changed:
+            # Same data, so keep the version (and its cached results)
+            old.as_of = datetime.now(timezone.utc)
+            snapshot_refreshes.inc(kind="unchanged")
+            return
+        self.columns = Columns(ids, price, quantity, available, as_of=datetime.now(timezone.utc))
+        snapshot_refreshes.inc(kind="incremental")
+
+
+# ============================================
+# Per-tenant snapshots
+# ============================================
+
+_snapshots: "weakref.WeakKeyDictionary[Tenant, ItemSnapshot]" = weakref.WeakKeyDictionary()
+_snapshots_lock = threading.Lock()
+
+
+def snapshot_for(tenant: Tenant) -> Columns:
+    """Current arrays of a tenant (503 without NumPy)."""
+    require_numpy()
+    with _snapshots_lock:
+        snapshot = _snapshots.get(tenant)
+        if snapshot is None:
+            snapshot = _snapshots[tenant] = ItemSnapshot(tenant.SessionLocal)
+    return snapshot.get()
+
+
+def refresh_all():
+    """Bring every snapshot that has been used up to date."""
+    with _snapshots_lock:
+        snapshots: List[ItemSnapshot] = list(_snapshots.values())
+    for snapshot in snapshots:
+        if snapshot.columns is not None:
+            snapshot.refresh()
+
+
+refresh_task = PeriodicTask("item-snapshot-refresh", SNAPSHOT_REFRESH_SECONDS, refresh_all)
+
+
+@reprice.on_reprice
+def _refresh_after_reprice(tenant: Tenant, updated: int):
+    """A reprice changes many prices at once; show them without waiting."""
+    with _snapshots_lock:
+        snapshot = _snapshots.get(tenant)
+    if snapshot is not None and snapshot.columns is not None:
+        snapshot.refresh()
+
+
+# ============================================
+# Reports
+# ============================================
+
+# The price reports work on sorted prices: a histogram is a binary
+# search per bin edge and a percentile is an array lookup, instead of a
+# pass over every item per request.
+
+def price_histogram(columns: Columns, bins: int, min_price: Optional[float],
+                    max_price: Optional[float], available_only: bool) -> dict:
+    prices = columns.sorted_prices(available_only)
+    low = min_price if min_price is not None else (float(prices[0]) if len(prices) else 0.0)
+    high = max_price if max_price is not None else (float(prices[-1]) if len(prices) else 0.0)
+    if high <= low:
+        high = low + 1.0  # Bins need a non-empty range
+    edges = np.linspace(low, high, bins + 1)
+
+    # Bins include their start; the last one includes its end too (like np.histogram)
+    bounds = np.searchsorted(prices, edges, side="left")
+    bounds[-1] = np.searchsorted(prices, high, side="right")
+    counts = np.diff(bounds)
+    return {
+        "items": int(counts.sum()),
+        "bins": [
+            {"start": float(edges[i]), "end": float(edges[i + 1]), "count": int(counts[i])}
+            for i in range(bins)
+        ],
+        "as_of": columns.as_of
+    }
+
+
+def price_percentiles(columns: Columns, percentiles: List[float], available_only: bool) -> dict:
+    prices = columns.sorted_prices(available_only)
+    if len(prices):
+        # Linear interpolation between the closest ranks (np.percentile's default)
+        rank = np.asarray(percentiles) / 100 * (len(prices) - 1)
+        below = np.floor(rank).astype(np.int64)
+        above = np.ceil(rank).astype(np.int64)
+        values = prices[below] + (prices[above] - prices[below]) * (rank - below)
+    else:
+        values = [None] * len(percentiles)
+    return {
+        "items": int(len(prices)),
+        "percentiles": {
+            f"{p:g}": (float(value) if value is not None else None)
+            for p, value in zip(percentiles, values)
+        },
+        "as_of": columns.as_of
+    }
+
+
+def stock_value(columns: Columns) -> dict:
+    if "stock_value" in columns._cache:
+        return columns._cache["stock_value"]
+
+    # One pass per figure, split by availability: [unavailable, available]
+    groups = columns.available.view(np.uint8)
+    items = np.bincount(groups, minlength=2)
+    quantity = np.bincount(groups, weights=columns.quantity, minlength=2)
+    value = np.bincount(groups, weights=columns.price * columns.quantity, minlength=2)
+
+    def summary(i):
+        return {
+            "items": int(items[i].sum()),
+            "quantity": int(quantity[i].sum()),
+            "value": round(float(value[i].sum()), 2)
+        }
+
+    result = columns._cache["stock_value"] = {
+        "available": summary(1),
+        "unavailable": summary(0),
+        "total": summary(slice(None)),
+        "as_of": columns.as_of
+    }
+    return result
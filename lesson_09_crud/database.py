@@ -8,6 +8,8 @@ SQLAlchemy is an ORM (Object-Relational Mapper) that lets you:
 - Query the database using Python code instead of raw SQL
 """
 
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
@@ -28,10 +30,28 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./items.db"
 # The engine is the starting point for SQLAlchemy
 # It manages the database connection
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite only
-)
+# How many connections the engine keeps open. Plain `def` endpoints run
+# on a worker threadpool that is sized to match (see threadpool.py), so
+# every worker thread can always get a connection.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+
+# Extra connections for work outside the worker threadpool: backups,
+# the idempotency purge, analytics snapshot refreshes and imports. Without
+# them those jobs would take connections the worker threads count on.
+BACKGROUND_CONNECTIONS = 5
+
+
+def make_engine(url: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = BACKGROUND_CONNECTIONS):
+    """Create an engine for one SQLite file (also used per tenant, see tenants.py)."""
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False},  # Needed for SQLite only
+        pool_size=pool_size,
+        max_overflow=max_overflow  # Opened only while the whole pool is in use
+    )
+
+
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 
 
 # ============================================
@@ -39,8 +59,12 @@ engine = create_engine(
 # ============================================
 # Sessions are used to interact with the database
 # Each request gets its own session
+# expire_on_commit=False keeps loaded values readable after the session
+# is closed (get_db closes it before the response is serialized)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 
 
 # ============================================
@@ -55,8 +79,12 @@ class Base(DeclarativeBase):
 # ============================================
 # STEP 5: Dependency for FastAPI
 # ============================================
-# This function creates a new database session for each request
-# and closes it when the request is done
+# This function provides a database session for each request
+# and closes it when the endpoint is done.
+#
+# Creating a Session is cheap: it only takes a connection from the pool
+# when the first query runs, so requests that never touch the database
+# (failed validation, cached answers) don't hold a connection.
 
 def get_db():
     """
@@ -64,8 +92,12 @@ def get_db():
 
     Usage in FastAPI:
         @app.get("/items")
-        def get_items(db: Session = Depends(get_db)):
+        def get_items(db: Session = Depends(get_db, scope="function")):
             ...
+
+    scope="function" closes the session (returning its connection to
+    the pool) as soon as the endpoint returns, instead of holding it
+    until the response has been serialized and sent.
     """
     db = SessionLocal()
     try:
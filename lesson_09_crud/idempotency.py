@@ -0,0 +1,188 @@
+"""
+IDEMPOTENCY KEYS
+=================
+Makes retried creates safe.
+
+A client that times out on POST /items can't tell whether the item was
+created, so it retries - and may create it twice. With an
+Idempotency-Key header (any unique string, e.g. a UUID, reused for
+every retry of the same request) the API creates it only once:
+
+    POST /items   Idempotency-Key: 5f0c...   -> 201, creates the item
+    POST /items   Idempotency-Key: 5f0c...   -> 201, same body, nothing
+                                                written; header
+                                                Idempotent-Replayed: true
+
+The response is stored in the idempotency_keys table in the same
+transaction as the item, so there is never an item without its record
+(or the other way round). Records expire after IDEMPOTENCY_TTL_SECONDS.
+Each tenant (see tenants.py) keeps its own records in its own database.
+
+Retries that arrive while the first request is still running wait for
+it on a per-key lock and then replay its response. Across processes the
+table's primary key catches the duplicate, and the loser gets 409.
+
+Reusing a key with a different request body is a client bug and gets
+422.
+"""
+
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import tenants
+from background import PeriodicTask
+from database import SessionLocal
+from metrics import Counter
+from models import IdempotencyRecord
+
+# How long a stored response can be replayed (24 hours)
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+
+# How often expired records are deleted (0 disables it)
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = 60 * 60
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+idempotency_replays = Counter(
+    "idempotency_replays_total", "Requests answered from a stored response", ["scope"]
+)
+
+
+# ============================================
+# Per-key single flight
+# ============================================
+
+class KeyedLocks:
+    """One lock per key, dropped again once nobody holds or waits for it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}  # key -> [lock, users]
+
+    @contextmanager
+    def hold(self, key):
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+_locks = KeyedLocks()
+
+
+@contextmanager
+def single_flight(scope: str, key: Optional[str], tenant: str = "default"):
+    """
+    Serialize requests that share an idempotency key (no-op without one).
+
+    A duplicate committed by another process shows up as an
+    IntegrityError on our record, which becomes 409 Conflict.
+    """
+    if key is None:
+        yield
+        return
+
+    with _locks.hold((tenant, scope, key)):
+        try:
+            yield
+        except IntegrityError as exc:
+            if IdempotencyRecord.__tablename__ not in str(exc.orig):
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is already being processed"
+            ) from exc
+
+
+# ============================================
+# Stored responses
+# ============================================
+
+def fingerprint(body: BaseModel) -> str:
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def replay(db: Session, scope: str, key: Optional[str], body: BaseModel) -> Optional[Response]:
+    """The stored response for this key, or None if the request is new."""
+    if key is None:
+        return None
+
+    record = db.get(IdempotencyRecord, (scope, key))
+    if record is None:
+        return None
+    if _now() - record.created_at > timedelta(seconds=IDEMPOTENCY_TTL_SECONDS):
+        db.delete(record)
+        db.flush()
+        return None
+    if record.request_hash != fingerprint(body):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+
+    idempotency_replays.inc(scope=scope)
+    return Response(
+        content=record.response,
+        status_code=record.status_code,
+        media_type="application/json",
+        headers={REPLAY_HEADER: "true"}
+    )
+
+
+def remember(
+    db: Session,
+    scope: str,
+    key: Optional[str],
+    body: BaseModel,
+    response: BaseModel,
+    status_code: int = status.HTTP_201_CREATED
+):
+    """Store the response in the current transaction (no-op without a key)."""
+    if key is None:
+        return
+    db.add(IdempotencyRecord(
+        scope=scope,
+        key=key,
+        request_hash=fingerprint(body),
+        status_code=status_code,
+        response=response.model_dump_json()
+    ))
+
+
+def purge_expired(session_factory=SessionLocal) -> int:
+    """Delete records older than the TTL."""
+    cutoff = func.datetime("now", f"-{int(IDEMPOTENCY_TTL_SECONDS)} seconds")
+    with session_factory() as db:
+        removed = db.execute(
+            delete(IdempotencyRecord).where(IdempotencyRecord.created_at < cutoff)
+        ).rowcount
+        db.commit()
+    return removed
+
+
+def purge_all_tenants():
+    for tenant in tenants.open_tenants():
+        purge_expired(tenant.SessionLocal)
+
+
+purge_task = PeriodicTask("idempotency-purge", IDEMPOTENCY_PURGE_INTERVAL_SECONDS, purge_all_tenants)
@@ -0,0 +1,310 @@
+"""
+CATALOG IMPORT
+===============
+Load a large CSV or NDJSON catalog into items, streaming.
+
+Millions of POST /items requests take hours: one request, one
+transaction and one disk sync per item. Here the file is read a line at
+a time and written in chunks:
+
+    read IMPORT_CHUNK_SIZE rows -> validate them as ItemCreate
+                                -> upsert them in one transaction -> repeat
+
+Only one chunk is held in memory at a time, so memory stays the same for
+a thousand rows or ten million, whether the file comes from disk (the
+command line below) or from a request body (POST /items/import).
+
+Formats (the header/keys are ItemCreate's fields; empty CSV cells use
+the defaults):
+
+    csv      name,description,price,quantity,is_available
+             Laptop,15 inch,999.99,5,true
+    ndjson   {"name": "Laptop", "description": "15 inch", "price": 999.99}
+
+Upsert by name
+--------------
+A row whose name already exists replaces that item's other fields;
+any other row is inserted. Names aren't unique in the items table, so
+an existing name updates every item with it. Within one chunk the
+last row for a name wins.
+
+Rows that fail validation are skipped and reported with their line
+number (the first MAX_REPORTED_REJECTS of them; all are counted). Each
+chunk commits on its own, so a failure part way through keeps the
+chunks before it. A file that stops being readable (bytes that aren't
+UTF-8, broken CSV quoting) ends the import: the rows read so far are
+written, and the report gives the error and last_line, the last line
+imported. Import again to resume; the upsert makes that safe.
+
+Command line:
+    python item_import.py catalog.csv
+    python item_import.py catalog.ndjson acme    # into tenant "acme"
+"""
+
+import codecs
+import csv
+import io
+import json
+import sys
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import anyio.from_thread
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import bindparam, insert, select, update
+
+from metrics import Counter
+from models import Item
+from schemas import ItemCreate
+from tenants import Tenant
+
+# Rows validated and written per transaction
+IMPORT_CHUNK_SIZE = 5_000
+
+# Rejected rows listed in the report (the rest are only counted)
+MAX_REPORTED_REJECTS = 100
+
+imported_rows = Counter("items_imported_total", "Rows read by catalog imports, by result", ["result"])
+
+item_table = Item.__table__
+_chunk_adapter = TypeAdapter(List[ItemCreate])
+
+# Executemany statements, one parameter set per row (see reservations.py
+# for why these skip the ORM)
+INSERT = insert(item_table)
+UPDATE = update(item_table).where(item_table.c.name == bindparam("match_name"))
+
+
+class ChunkReader(io.RawIOBase):
+    """Read-only file over an iterator of byte strings, e.g. a request body."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            self._pending = next(self._chunks, None)
+            if self._pending is None:
+                self._pending = b""
+                return 0  # End of file
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def decode_lines(binary: Iterable[bytes]) -> Iterator[str]:
+    """
+    Lines of a binary file as text (UTF-8, with or without a BOM).
+
+    Decoded one line at a time, so a byte that isn't UTF-8 stops the
+    import at its own line, not at the start of the block it was read in.
+    """
+    for number, line in enumerate(binary, start=1):
+        if number == 1:
+            line = line.removeprefix(codecs.BOM_UTF8)
+        yield line.decode("utf-8")
+
+
+def open_text(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Lines of a byte stream, e.g. a request body."""
+    return decode_lines(io.BufferedReader(ChunkReader(chunks)))
+
+
+def body_chunks(stream: AsyncIterator[bytes]) -> Iterator[bytes]:
+    """
+    A request body (request.stream()) as a plain iterator.
+
+    For a worker thread: each next() waits for the event loop to
+    receive the next piece of the upload, so the import never holds
+    more than a chunk of it.
+    """
+    while True:
+        try:
+            yield anyio.from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            return
+
+
+# ============================================
+# Parsing
+# ============================================
+
+# Yields (line number, row dict) or (line number, error message)
+
+def _csv_rows(text) -> Iterator[Tuple[int, object]]:
+    reader = csv.DictReader(text)
+    for row in reader:
+        # Empty cells (and cells past the header) fall back to the defaults
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in ("", None)}
+
+
+def _ndjson_rows(text) -> Iterator[Tuple[int, object]]:
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, f"invalid JSON: {exc.msg}"
+            continue
+        yield line_number, row if isinstance(row, dict) else "expected a JSON object"
+
+
+def _validate(rows: List[Tuple[int, dict]]) -> Tuple[List[Tuple[int, ItemCreate]], List[dict]]:
+    """Validate a chunk at once; only a chunk with errors is looked at row by row."""
+    try:
+        items = _chunk_adapter.validate_python([row for _, row in rows])
+        return [(line, item) for (line, _), item in zip(rows, items)], []
+    except ValidationError as exc:
+        errors: Dict[int, List[str]] = {}
+        for error in exc.errors():
+            index, *field = error["loc"]
+            errors.setdefault(index, []).append(
+                ".".join(str(part) for part in field) + ": " + error["msg"] if field else error["msg"]
+            )
+    valid = [
+        (line, ItemCreate.model_validate(row))
+        for index, (line, row) in enumerate(rows) if index not in errors
+    ]
+    rejected = [{"line": rows[index][0], "error": "; ".join(messages)} for index, messages in errors.items()]
+    return valid, rejected
+
+
+# ============================================
+# Writing
+# ============================================
+
+def _upsert(session_factory, items: List[ItemCreate]) -> Tuple[int, int]:
+    """Write one chunk in one transaction; returns (inserted, updated)."""
+    by_name = {item.name: item.model_dump() for item in items}  # Last row wins
+    with session_factory() as db:
+        # Lock first, so no other writer can add a name between the
+        # SELECT and the INSERT (as in reservations.py)
+        connection = db.connection()
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        existing = set(connection.scalars(
+            select(item_table.c.name).where(item_table.c.name.in_(list(by_name)))
+        ))
+        new_rows = [row for name, row in by_name.items() if name not in existing]
+        changed_rows = [
+            {"match_name": name, **{key: value for key, value in row.items() if key != "name"}}
+            for name, row in by_name.items() if name in existing
+        ]
+        if new_rows:
+            connection.execute(INSERT, new_rows)
+        if changed_rows:
+            connection.execute(UPDATE, changed_rows)
+        db.commit()
+    return len(new_rows), len(changed_rows)
+
+
+def import_items(text: Iterable[str], fmt: str, tenant: Tenant,
+                 progress: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Import every row of a text stream (lines) into a tenant's items.
+
+    progress(report) is called after each committed chunk with the
+    running totals.
+    """
+    rows = _csv_rows(text) if fmt == "csv" else _ndjson_rows(text)
+    report = {
+        "rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "chunks": 0,
+        "last_line": 0, "error": None, "rejects": []
+    }
+
+    def reject(entries: List[dict]):
+        report["rejected"] += len(entries)
+        imported_rows.inc(len(entries), result="rejected")
+        room = MAX_REPORTED_REJECTS - len(report["rejects"])
+        report["rejects"].extend(entries[:max(room, 0)])
+
+    def write(chunk: List[Tuple[int, dict]]):
+        valid, rejected = _validate(chunk)
+        reject(rejected)
+        if valid:
+            inserted, updated = _upsert(tenant.SessionLocal, [item for _, item in valid])
+            report["inserted"] += inserted
+            report["updated"] += updated
+            imported_rows.inc(inserted, result="inserted")
+            imported_rows.inc(updated, result="updated")
+        report["chunks"] += 1
+        if progress is not None:
+            progress(report)
+
+    chunk: List[Tuple[int, dict]] = []
+    try:
+        try:
+            for line_number, row in rows:
+                report["rows"] += 1
+                report["last_line"] = line_number
+                if isinstance(row, str):
+                    reject([{"line": line_number, "error": row}])
+                    continue
+                chunk.append((line_number, row))
+                if len(chunk) == IMPORT_CHUNK_SIZE:
+                    write(chunk)
+                    chunk = []
+        except UnicodeDecodeError as exc:
+            report["error"] = f"file is not UTF-8 after line {report['last_line']}: {exc.reason}"
+        except csv.Error as exc:
+            report["error"] = f"malformed CSV after line {report['last_line']}: {exc}"
+        # Rows read before an error are still imported
+        if chunk:
+            write(chunk)
+    finally:
+        # One reload of the autocomplete index instead of a change per row;
+        # the analytics snapshot picks the rows up through updated_at
+        if report["inserted"] or report["updated"]:
+            tenant.suggest.reset()
+    return report
+
+
+# ============================================
+# Command line
+# ============================================
+
+def _print_progress(started: float):
+    def progress(report: dict):
+        seconds = time.perf_counter() - started
+        print(
+            f"  {report['rows']:>12,} rows  {report['inserted']:>12,} inserted  "
+            f"{report['updated']:>10,} updated  {report['rejected']:>8,} rejected  "
+            f"{report['rows'] / seconds:>9,.0f} rows/s",
+            file=sys.stderr
+        )
+    return progress
+
+
+if __name__ == "__main__":
+    import item_stats
+    import search_index
+    from database import Base
+    from tenants import default_tenant, get_tenant
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: python item_import.py FILE.csv|FILE.ndjson [TENANT]")
+    path = sys.argv[1]
+    fmt = "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+    tenant = get_tenant(sys.argv[2]) if len(sys.argv) > 2 else default_tenant
+    if tenant is default_tenant:
+        # What main.py does at startup (tenant databases are set up on open)
+        Base.metadata.create_all(bind=tenant.engine)
+        search_index.create_search_index(tenant.engine)
+        item_stats.create_item_stats(tenant.engine)
+
+    with open(path, "rb") as binary:
+        report = import_items(
+            decode_lines(binary), fmt, tenant, progress=_print_progress(time.perf_counter())
+        )
+
+    for entry in report["rejects"]:
+        print(f"  line {entry['line']}: {entry['error']}", file=sys.stderr)
+    print(json.dumps({key: value for key, value in report.items() if key != "rejects"}))
+    if report["error"]:
+        sys.exit(f"Import stopped: {report['error']}")
@@ -0,0 +1,129 @@
+"""
+ITEM COUNTERS
+==============
+Totals for GET /items/stats/count without counting rows on every call.
+
+Counting items, available items, units in stock and stock value means
+reading the whole items table. Instead, a one-row table holds the
+totals and triggers adjust it on every INSERT, UPDATE and DELETE on
+items, in the same transaction as the change:
+
+    items        <- the real table (SQLAlchemy model in models.py)
+    item_stats   <- one row: total_items, available_items,
+                    total_quantity, stock_value
+
+Reading the stats is then a primary-key lookup, however big the catalog
+gets. Like the search index triggers, they also catch changes made
+outside the API.
+
+Every write to items now also updates this one row. That would be a
+hot spot in a database with row locks, but SQLite lets one writer at a
+time into the file anyway, so it adds no waiting.
+
+The counters are filled with one pass over items (TOTALS_SQL) only when
+the table is first created; opening the app or a tenant again reads
+nothing else. stock_value is a float updated by small additions and
+subtractions, so rounding errors could slowly add up over many writes;
+POST /admin/item-stats/recount redoes the full pass to correct it.
+"""
+
+from sqlalchemy import column, select, table
+from sqlalchemy.orm import Session
+
+# Lightweight table object so the counters can be used in select()
+item_stats = table(
+    "item_stats",
+    column("id"),
+    column("total_items"),
+    column("available_items"),
+    column("total_quantity"),
+    column("stock_value")
+)
+
+# Every total in one scan; CASE/COALESCE treat NULLs as 0 / unavailable
+TOTALS_SQL = """
+    SELECT
+        COUNT(*),
+        COALESCE(SUM(CASE WHEN is_available THEN 1 ELSE 0 END), 0),
+        COALESCE(SUM(COALESCE(quantity, 0)), 0),
+        COALESCE(SUM(price * COALESCE(quantity, 0)), 0.0)
+    FROM items
+"""
+
+# What one row adds to the totals; `row` is new or old in a trigger
+_CONTRIBUTION = {
+    "total_items": "1",
+    "available_items": "(CASE WHEN {row}.is_available THEN 1 ELSE 0 END)",
+    "total_quantity": "COALESCE({row}.quantity, 0)",
+    "stock_value": "{row}.price * COALESCE({row}.quantity, 0)",
+}
+
+
+def _adjust(*terms) -> str:
+    """SET clause adding (+, new) and/or subtracting (-, old) a row."""
+    return ", ".join(
+        f"{name} = {name}" + "".join(f" {sign} {value.format(row=row)}" for sign, row in terms)
+        for name, value in _CONTRIBUTION.items()
+    )
+
+
+STATS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS item_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_items INTEGER NOT NULL,
+        available_items INTEGER NOT NULL,
+        total_quantity INTEGER NOT NULL,
+        stock_value REAL NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS item_stats_insert AFTER INSERT ON items BEGIN
+        UPDATE item_stats SET {_adjust(("+", "new"))} WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS item_stats_delete AFTER DELETE ON items BEGIN
+        UPDATE item_stats SET {_adjust(("-", "old"))} WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS item_stats_update
+    AFTER UPDATE OF price, quantity, is_available ON items BEGIN
+        UPDATE item_stats SET {_adjust(("-", "old"), ("+", "new"))} WHERE id = 1;
+    END
+    """,
+]
+
+
+# One statement, so no write can slip in between count and store
+_RECOUNT_SQL = f"INSERT OR REPLACE INTO item_stats SELECT 1, * FROM ({TOTALS_SQL})"
+
+
+def create_item_stats(engine):
+    """Create the counters and triggers, filling them on first run."""
+    with engine.begin() as conn:
+        for ddl in STATS_DDL:
+            conn.exec_driver_sql(ddl)
+        if conn.exec_driver_sql("SELECT 1 FROM item_stats WHERE id = 1").first() is None:
+            conn.exec_driver_sql(_RECOUNT_SQL)
+
+
+def recount(engine) -> dict:
+    """Recompute the totals from items (a full scan), fixing any drift."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(_RECOUNT_SQL)
+    with Session(engine) as db:
+        return read(db)
+
+
+def read(db) -> dict:
+    """Current totals: one row lookup."""
+    row = db.execute(select(item_stats).where(item_stats.c.id == 1)).one()
+    return {
+        "total_items": row.total_items,
+        "available_items": row.available_items,
+        "unavailable_items": row.total_items - row.available_items,
+        "total_quantity": row.total_quantity,
+        "stock_value": round(row.stock_value, 2)
+    }
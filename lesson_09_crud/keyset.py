@@ -0,0 +1,126 @@
+"""
+SORTING AND KEYSET PAGINATION
+==============================
+Index-backed `?sort=` and `?cursor=` support for list endpoints.
+
+Sorting:
+    ?sort=-price,name    (- means descending)
+
+Only sort orders that an index can deliver are accepted, so SQLite
+reads rows straight off the index in order instead of sorting them in a
+temporary B-tree. Each supported order may also be fully reversed, since
+SQLite can walk an index backwards. The row id is always added as a
+final tie-breaker so the order is total. SQLite indexes already end with
+the rowid, so the tie-breaker costs nothing.
+
+Keyset ("cursor") pagination:
+    GET /items?sort=created_at&limit=20            -> X-Next-Cursor: eyJ...
+    GET /items?sort=created_at&limit=20&cursor=eyJ...
+
+?skip=10000 makes the database read and throw away 10,000 rows. A
+cursor holds the sort values of the last row instead, and the next page
+starts with WHERE (sort values) > (cursor values). That is an index
+seek, so page 1000 is as fast as page 1.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, String, and_, or_, type_coerce
+
+# SQLite stores CURRENT_TIMESTAMP as text in this format
+SQLITE_DATETIME = "%Y-%m-%d %H:%M:%S"
+
+
+def _reverse(spec: str) -> str:
+    return ",".join(key[1:] if key.startswith("-") else f"-{key}" for key in spec.split(","))
+
+
+def parse_sort(sort: str, columns: Dict[str, object], supported: Iterable[str]) -> List[Tuple]:
+    """
+    Turn "-price,name" into [(column, descending), ...].
+
+    `columns` maps field names to model columns (must include "id");
+    `supported` lists the index-backed orders. Raises 400 otherwise.
+    """
+    sort = sort.replace(" ", "")
+    allowed = set(supported) | {"id"}
+    allowed |= {_reverse(spec) for spec in allowed}
+
+    if sort not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported sort '{sort}'. Supported: {', '.join(sorted(allowed))}"
+        )
+
+    keys = [(columns[key.lstrip("-")], key.startswith("-")) for key in sort.split(",")]
+    if keys[-1][0] is not columns["id"]:
+        # Tie-break on id in the direction the index stores it
+        keys.append((columns["id"], keys[-1][1]))
+    return keys
+
+
+def _comparable(column):
+    # Compare datetimes as the text SQLite stored, not as re-formatted
+    # Python values, so equality checks in the cursor condition hold
+    if isinstance(column.type, DateTime):
+        return type_coerce(column, String)
+    return column
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        fmt = SQLITE_DATETIME + (".%f" if value.microsecond else "")
+        return value.strftime(fmt)
+    return value
+
+
+def encode_cursor(row, keys) -> str:
+    """Cursor pointing just after `row`."""
+    values = [_to_json(getattr(row, column.key)) for column, _ in keys]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(cursor: str, keys) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        values = None
+    # Only plain values may reach the WHERE clause: null would make
+    # "col > NULL" match nothing, and a list or object can't be bound
+    if (not isinstance(values, list) or len(values) != len(keys)
+            or not all(isinstance(value, (str, int, float)) for value in values)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor (was it created with a different sort?)"
+        )
+    return values
+
+
+def paginate(stmt, keys, cursor: str = None):
+    """Add ORDER BY for `keys` and, given a cursor, the seek condition."""
+    stmt = stmt.order_by(*[column.desc() if desc else column.asc() for column, desc in keys])
+    if cursor is None:
+        return stmt
+
+    values = _decode_cursor(cursor, keys)
+
+    # (a, b, id) "after" (va, vb, vid) expands to:
+    #   a > va  OR  (a = va AND b > vb)  OR  (a = va AND b = vb AND id > vid)
+    # with > flipped to < for descending keys
+    conditions = []
+    for i, (column, desc) in enumerate(keys):
+        equal_before = [_comparable(c) == v for (c, _), v in zip(keys[:i], values[:i])]
+        column_value = _comparable(column)
+        past = column_value < values[i] if desc else column_value > values[i]
+        conditions.append(and_(*equal_before, past))
+
+    # The redundant bound on the first key lets SQLite seek into the
+    # index rather than evaluate the OR for every row
+    first, desc = keys[0]
+    first_value = _comparable(first)
+    bound = first_value <= values[0] if desc else first_value >= values[0]
+    return stmt.where(bound, or_(*conditions))
@@ -11,6 +11,7 @@ Learning Objectives:
 
 Installation:
     pip install fastapi uvicorn sqlalchemy
+    pip install numpy   # Optional, for /items/analytics/...
 
 To run:
     uvicorn main:app --reload
@@ -22,38 +23,107 @@ Project Structure:
     ├── main.py        # FastAPI app (this file)
     ├── database.py    # Database connection setup
     ├── models.py      # SQLAlchemy ORM models
-    └── schemas.py     # Pydantic request/response schemas
+    ├── schemas.py     # Pydantic request/response schemas
+    ├── search_index.py  # Trigram index for substring search
+    ├── item_stats.py  # Trigger-maintained totals for /items/stats/count
+    ├── suggest.py     # In-memory prefix autocomplete
+    ├── keyset.py      # Index-backed sorting and cursor pagination
+    ├── tenants.py     # One database file per tenant (X-Tenant header)
+    ├── backup.py      # Online backups of items.db
+    ├── idempotency.py # Idempotency-Key support for safe retries
+    ├── batch.py       # POST /batch: many operations, one transaction
+    ├── reservations.py  # Atomic stock reservations with group commit
+    ├── reprice.py     # Set-based bulk price changes
+    ├── item_import.py # Streaming CSV/NDJSON catalog import (also a CLI)
+    ├── columnar.py    # NumPy snapshot of items for analytics
+    ├── background.py  # Periodic background jobs
+    ├── metrics.py     # Prometheus-style counters for GET /metrics
+    ├── threadpool.py  # Worker threadpool sizing and metrics
+    ├── bench_search.py  # Price search benchmark on a large catalog
+    └── bench_reserve.py # Reservation contention benchmark
 """
 
-from fastapi import FastAPI, HTTPException, status, Depends
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, status, Depends, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 # Import our modules
-from database import engine, get_db, Base
+import backup
+import batch
+import columnar
+import idempotency
+import item_import
+import item_stats
+import keyset
+import metrics
+import reprice
+import reservations
+import search_index
+import suggest
+from database import engine, Base
 from models import Item
-from schemas import ItemCreate, ItemUpdate, ItemResponse
+from schemas import (
+    ItemCreate, ItemUpdate, ItemResponse, ItemSuggestion, ReserveRequest, OrderRequest,
+    RepriceRequest, RepriceResponse, ImportReport,
+    BatchRequest, BatchResponse
+)
+from tenants import Tenant, get_tenant, get_tenant_db
+from threadpool import ThreadpoolWaitMiddleware, configure_threadpool, track_threadpool_wait
 
 
 # ============================================
 # STEP 1: Create the FastAPI App
 # ============================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Runs once at startup (before yield) and once at shutdown (after)."""
+    # Size the worker threadpool to match the DB pool (see threadpool.py)
+    configure_threadpool()
+    # Nightly online backup of items.db (see backup.py)
+    backup.backup_task.start()
+    # Hourly cleanup of expired Idempotency-Key records
+    idempotency.purge_task.start()
+    # Keeps the analytics snapshots (see columnar.py) up to date
+    columnar.refresh_task.start()
+    yield
+    columnar.refresh_task.stop()
+    idempotency.purge_task.stop()
+    backup.backup_task.stop()
+
+
 app = FastAPI(
     title="CRUD with SQLAlchemy",
     description="Learn database operations with FastAPI and SQLAlchemy",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # Runs before every endpoint and records threadpool queue time
+    dependencies=[Depends(track_threadpool_wait)]
 )
 
+app.add_middleware(ThreadpoolWaitMiddleware)
+
 
 # ============================================
 # STEP 2: Create Database Tables
 # ============================================
 # This creates all tables defined in models.py
 # Only creates tables that don't exist yet
+# (Tenant databases get theirs on first use - see tenants.py)
 
 Base.metadata.create_all(bind=engine)
 
+# Trigram index for /items/search/ (see search_index.py)
+search_index.create_search_index(engine)
+
+# Counters behind /items/stats/count (see item_stats.py)
+item_stats.create_item_stats(engine)
+
 
 # ============================================
 # STEP 3: Home Endpoint
@@ -70,18 +140,76 @@ def home():
             "Read All": "GET /items",
             "Read One": "GET /items/{id}",
             "Update": "PUT /items/{id}",
-            "Delete": "DELETE /items/{id}"
+            "Delete": "DELETE /items/{id}",
+            "Reserve": "POST /items/{id}/reserve",
+            "Reprice": "POST /items/reprice",
+            "Import": "POST /items/import?format=csv",
+            "Analytics": "GET /items/analytics/stock-value",
+            "Batch": "POST /batch",
+            "Metrics": "GET /metrics",
+            "Backup": "POST /admin/backup"
         },
         "docs": "/docs"
     }
 
 
+# ============================================
+# Metrics Endpoint
+# ============================================
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Threadpool and database metrics in Prometheus format."""
+    return metrics.render_all()
+
+
+# ============================================
+# Admin Endpoints
+# ============================================
+
+@app.post("/admin/backup", status_code=status.HTTP_202_ACCEPTED)
+def start_backup():
+    """
+    Start an online backup of items.db (see backup.py).
+
+    Returns immediately; poll GET /admin/backup for progress.
+    """
+    if not backup.start_backup():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A backup is already running"
+        )
+    return backup.current.as_dict()
+
+
+@app.get("/admin/backup")
+def get_backup_status():
+    """Progress of the running backup, or the result of the last one."""
+    return backup.current.as_dict()
+
+
+@app.post("/admin/item-stats/recount")
+def recount_item_stats(tenant: Tenant = Depends(get_tenant)):
+    """
+    Recompute the /items/stats/count totals with a full pass over items.
+
+    The triggers keep them current; this only corrects float drift in
+    stock_value after very many writes (see item_stats.py).
+    """
+    return item_stats.recount(tenant.engine)
+
+
 # ============================================
 # STEP 4: CREATE - POST /items
 # ============================================
 
 @app.post("/items", response_model=ItemResponse, status_code=status.HTTP_201_CREATED)
-def create_item(item: ItemCreate, db: Session = Depends(get_db)):
+def create_item(
+    item: ItemCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    tenant: Tenant = Depends(get_tenant),
+    db: Session = Depends(get_tenant_db, scope="function")
+):
     """
     Create a new item in the database.
 
@@ -90,34 +218,53 @@ def create_item(item: ItemCreate, db: Session = Depends(get_db)):
     - **price**: Item price (required)
     - **quantity**: Stock quantity (default: 0)
     - **is_available**: Availability status (default: True)
+
+    Send an `Idempotency-Key` header to make retries safe: repeats of
+    the same key return the first response without creating anything
+    (see idempotency.py).
     """
-    # Create SQLAlchemy model instance
-    db_item = Item(
-        name=item.name,
-        description=item.description,
-        price=item.price,
-        quantity=item.quantity,
-        is_available=item.is_available
-    )
+    with idempotency.single_flight("POST /items", idempotency_key, tenant.name):
+        stored = idempotency.replay(db, "POST /items", idempotency_key, item)
+        if stored is not None:
+            return stored
 
-    # Add to database
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)  # Refresh to get the generated ID and timestamps
+        # INSERT ... RETURNING gives us the generated ID and timestamps
+        # without a second SELECT (db.refresh) after the commit
+        db_item = db.scalar(insert(Item).values(**item.model_dump()).returning(Item))
 
-    return db_item
+        # Copy the values out before commit() expires the object
+        created = ItemResponse.model_validate(db_item)
+        idempotency.remember(db, "POST /items", idempotency_key, item, created)
+        db.commit()
+
+    tenant.suggest.upsert(created.id, created.name, created.is_available, created.quantity)
+    return created
 
 
 # ============================================
 # STEP 5: READ ALL - GET /items
 # ============================================
 
+# Fields clients may sort by, and the orders an index can deliver
+# (each may also be fully reversed - see keyset.py and models.py)
+ITEM_SORT_COLUMNS = {
+    "id": Item.id,
+    "name": Item.name,
+    "price": Item.price,
+    "created_at": Item.created_at
+}
+ITEM_SORTS = ["name", "created_at", "price,name"]
+
+
 @app.get("/items", response_model=List[ItemResponse])
 def get_all_items(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     available_only: bool = False,
-    db: Session = Depends(get_db)
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_tenant_db, scope="function")
 ):
     """
     Get all items from the database.
@@ -125,13 +272,31 @@ def get_all_items(
     - **skip**: Number of items to skip (pagination)
     - **limit**: Maximum items to return
     - **available_only**: Only return available items
+    - **sort**: e.g. `price,name` or `-created_at` (- for descending)
+    - **cursor**: `X-Next-Cursor` header from the previous page; faster
+      than skip for deep pages
     """
-    query = db.query(Item)
+    stmt = select(Item)
 
     if available_only:
-        query = query.filter(Item.is_available == True)
+        stmt = stmt.where(Item.is_available == True)
+
+    if sort is None and cursor is None:
+        return db.scalars(stmt.offset(skip).limit(limit)).all()
+
+    # Sorted and/or cursor pagination
+    if cursor is not None and skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either skip or cursor, not both"
+        )
+    keys = keyset.parse_sort(sort or "id", ITEM_SORT_COLUMNS, ITEM_SORTS)
+    stmt = keyset.paginate(stmt, keys, cursor).offset(skip).limit(limit)
+    items = db.scalars(stmt).all()
 
-    items = query.offset(skip).limit(limit).all()
+    # A full page means there may be more; hand out a cursor for it
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = keyset.encode_cursor(items[-1], keys)
     return items
 
 
@@ -139,32 +304,94 @@ def get_all_items(
 # BONUS: Search Items
 # ============================================
 
+# Deepest offset search accepts; past it, page with the cursor instead
+MAX_SEARCH_SKIP = 10_000
+
+
 @app.get("/items/search/", response_model=List[ItemResponse])
 def search_items(
+    response: Response,
     q: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    db: Session = Depends(get_db)
+    available_only: bool = False,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, le=MAX_SEARCH_SKIP),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_tenant_db, scope="function")
 ):
     """
-    Search items by name and/or price range.
+    Search items by name/description and/or price range.
 
-    - **q**: Search query (searches in name)
+    - **q**: Substring to find in the name or description (case-insensitive)
     - **min_price**: Minimum price filter
     - **max_price**: Maximum price filter
+    - **available_only**: Only return available items
+    - **sort**: Same orders as GET /items; default `price,name` when a
+      price bound is given, else `id`
+    - **cursor**: `X-Next-Cursor` header from the previous page
+    - **skip**: Number of results to skip (up to 10,000; use cursor beyond)
+    - **limit**: Maximum results to return (up to 500)
+
+    Uses the trigram index from search_index.py instead of scanning
+    every row. A price range reads only its slice of the price index
+    (see models.py): sorted by price, the first `limit` index entries
+    are the answer, so SQLite stops there instead of filtering the
+    whole table in id order.
     """
-    query = db.query(Item)
+    if cursor is not None and skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either skip or cursor, not both"
+        )
+    price_range = min_price is not None or max_price is not None
+    keys = keyset.parse_sort(
+        sort or ("price,name" if price_range else "id"), ITEM_SORT_COLUMNS, ITEM_SORTS
+    )
+
+    stmt = select(Item)
 
     if q:
-        query = query.filter(Item.name.ilike(f"%{q}%"))
+        stmt = search_index.matching(stmt, q)
+
+    if available_only:
+        stmt = stmt.where(Item.is_available == True)
 
     if min_price is not None:
-        query = query.filter(Item.price >= min_price)
+        stmt = stmt.where(Item.price >= min_price)
 
     if max_price is not None:
-        query = query.filter(Item.price <= max_price)
+        stmt = stmt.where(Item.price <= max_price)
+
+    stmt = keyset.paginate(stmt, keys, cursor).offset(skip).limit(limit)
+    items = db.scalars(stmt).all()
 
-    return query.all()
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = keyset.encode_cursor(items[-1], keys)
+    return items
+
+
+# ============================================
+# BONUS: Autocomplete
+# ============================================
+
+@app.get("/items/suggest", response_model=List[ItemSuggestion])
+def suggest_items(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=suggest.MAX_SUGGESTIONS),
+    tenant: Tenant = Depends(get_tenant)
+):
+    """
+    Suggest item names starting with a prefix (for typeahead).
+
+    - **prefix**: What the user has typed so far (case-insensitive)
+    - **limit**: Number of suggestions
+
+    Available items come first, then the ones with the most stock.
+    Served from memory (see suggest.py), so no database session is used.
+    """
+    return tenant.suggest.suggest(prefix, limit)
 
 
 # ============================================
@@ -172,16 +399,55 @@ def search_items(
 # ============================================
 
 @app.get("/items/stats/count")
-def get_items_count(db: Session = Depends(get_db)):
-    """Get total count of items in database."""
-    total = db.query(Item).count()
-    available = db.query(Item).filter(Item.is_available == True).count()
+def get_items_count(db: Session = Depends(get_tenant_db, scope="function")):
+    """
+    Get item counts, units in stock and stock value (price x quantity).
 
-    return {
-        "total_items": total,
-        "available_items": available,
-        "unavailable_items": total - available
-    }
+    Read from counters that triggers keep up to date (see
+    item_stats.py), so this doesn't scan the items table.
+    """
+    return item_stats.read(db)
+
+
+# ============================================
+# BONUS: Analytics (NumPy)
+# ============================================
+# Served from an in-memory columnar copy of the items (see columnar.py),
+# at most a few seconds old. Returns 503 if NumPy isn't installed.
+
+@app.get("/items/analytics/price-histogram")
+def get_price_histogram(
+    bins: int = Query(20, ge=1, le=1000),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    available_only: bool = False,
+    tenant: Tenant = Depends(get_tenant)
+):
+    """Number of items per price band (bands span min_price..max_price)."""
+    columns = columnar.snapshot_for(tenant)
+    return columnar.price_histogram(columns, bins, min_price, max_price, available_only)
+
+
+@app.get("/items/analytics/price-percentiles")
+def get_price_percentiles(
+    p: List[float] = Query([25, 50, 75, 90, 99]),
+    available_only: bool = False,
+    tenant: Tenant = Depends(get_tenant)
+):
+    """Price percentiles, e.g. ?p=50&p=95 (default: 25, 50, 75, 90, 99)."""
+    if any(not 0 <= value <= 100 for value in p):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Percentiles must be between 0 and 100"
+        )
+    columns = columnar.snapshot_for(tenant)
+    return columnar.price_percentiles(columns, p, available_only)
+
+
+@app.get("/items/analytics/stock-value")
+def get_stock_value(tenant: Tenant = Depends(get_tenant)):
+    """Items, units and price x quantity, for available and unavailable items."""
+    return columnar.stock_value(columnar.snapshot_for(tenant))
 
 
 # ============================================
@@ -189,13 +455,14 @@ def get_items_count(db: Session = Depends(get_db)):
 # ============================================
 
 @app.get("/items/{item_id}", response_model=ItemResponse)
-def get_item(item_id: int, db: Session = Depends(get_db)):
+def get_item(item_id: int, db: Session = Depends(get_tenant_db, scope="function")):
     """
     Get a single item by ID.
 
     Raises 404 if item not found.
     """
-    item = db.query(Item).filter(Item.id == item_id).first()
+    # db.get checks the session's identity map before querying
+    item = db.get(Item, item_id)
 
     if item is None:
         raise HTTPException(
@@ -214,7 +481,8 @@ def get_item(item_id: int, db: Session = Depends(get_db)):
 def update_item(
     item_id: int,
     item_update: ItemUpdate,
-    db: Session = Depends(get_db)
+    tenant: Tenant = Depends(get_tenant),
+    db: Session = Depends(get_tenant_db, scope="function")
 ):
     """
     Update an existing item.
@@ -222,8 +490,16 @@ def update_item(
     Only updates fields that are provided.
     Raises 404 if item not found.
     """
-    # Find the item
-    db_item = db.query(Item).filter(Item.id == item_id).first()
+    # Update only provided fields
+    update_data = item_update.model_dump(exclude_unset=True)
+
+    if update_data:
+        # One UPDATE ... RETURNING instead of SELECT + UPDATE + SELECT
+        db_item = db.scalar(
+            update(Item).where(Item.id == item_id).values(**update_data).returning(Item)
+        )
+    else:
+        db_item = db.get(Item, item_id)
 
     if db_item is None:
         raise HTTPException(
@@ -231,16 +507,12 @@ def update_item(
             detail=f"Item with ID {item_id} not found"
         )
 
-    # Update only provided fields
-    update_data = item_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_item, field, value)
-
-    # Save changes
+    # Copy the values out before commit() expires the object
+    updated = ItemResponse.model_validate(db_item)
     db.commit()
-    db.refresh(db_item)
 
-    return db_item
+    tenant.suggest.upsert(updated.id, updated.name, updated.is_available, updated.quantity)
+    return updated
 
 
 # ============================================
@@ -248,62 +520,186 @@ def update_item(
 # ============================================
 
 @app.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_item(item_id: int, db: Session = Depends(get_db)):
+def delete_item(
+    item_id: int,
+    tenant: Tenant = Depends(get_tenant),
+    db: Session = Depends(get_tenant_db, scope="function")
+):
     """
     Delete an item by ID.
 
     Raises 404 if item not found.
     """
-    db_item = db.query(Item).filter(Item.id == item_id).first()
+    # A single DELETE; rowcount tells us whether the item existed
+    result = db.execute(delete(Item).where(Item.id == item_id))
 
-    if db_item is None:
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Item with ID {item_id} not found"
         )
 
-    db.delete(db_item)
     db.commit()
 
+    tenant.suggest.remove(item_id)
     return None
 
 
+# ============================================
+# BONUS: Reserve Stock
+# ============================================
+
+@app.post("/items/reserve", response_model=List[ItemResponse])
+def reserve_order(order: OrderRequest, tenant: Tenant = Depends(get_tenant)):
+    """
+    Reserve several items at once, e.g. for a shopping cart.
+
+    All lines are reserved or none are: 409 names the first item without
+    enough stock, 404 an unknown item.
+    """
+    lines = [(line.item_id, line.quantity) for line in order.items]
+    return reservations.queue_for(tenant).submit(lines)
+
+
+@app.post("/items/{item_id}/reserve", response_model=ItemResponse)
+def reserve_item(item_id: int, request: ReserveRequest, tenant: Tenant = Depends(get_tenant)):
+    """
+    Take `quantity` units out of stock without a read-modify-write race.
+
+    Returns the item with its new quantity; is_available turns false
+    when the last unit goes. 409 if there isn't enough stock (nothing
+    is reserved then). See reservations.py.
+    """
+    return reservations.queue_for(tenant).submit([(item_id, request.quantity)])[0]
+
+
+# ============================================
+# BONUS: Bulk Reprice
+# ============================================
+
+@app.post("/items/reprice", response_model=RepriceResponse)
+def reprice_items(
+    request: RepriceRequest,
+    tenant: Tenant = Depends(get_tenant),
+    db: Session = Depends(get_tenant_db, scope="function")
+):
+    """
+    Change the price of every item matching a filter.
+
+    e.g. 10% off available laptops, rounded to 0.05:
+    {"filter": {"name": "laptop%", "is_available": true},
+     "adjust": "percent", "value": -10, "round_to": 0.05}
+
+    Runs as UPDATE statements in the database (in chunks for large
+    sets), not one request per item. dry_run=true only counts the items
+    that would change and shows a few. See reprice.py.
+    """
+    if request.dry_run:
+        return reprice.preview(db, request)
+    return reprice.apply(db, request, tenant)
+
+
+# ============================================
+# BONUS: Catalog Import
+# ============================================
+
+@app.post("/items/import", response_model=ImportReport)
+async def import_items(
+    request: Request,
+    fmt: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    tenant: Tenant = Depends(get_tenant)
+):
+    """
+    Create or update items from a CSV or NDJSON upload.
+
+        curl -X POST "localhost:8000/items/import?format=csv" \\
+             -H "Content-Type: text/csv" --data-binary @catalog.csv
+
+    Rows are matched to items by name. The body is parsed while it
+    arrives and written in chunks of 5,000 rows per transaction, so
+    any file size works. The report lists rejected rows by line number.
+    A file that isn't UTF-8 or isn't valid CSV gives 400 with the
+    report so far (everything up to `last_line` was imported).
+    See item_import.py (which also runs from the command line).
+
+    `async def` so the body can be streamed; the parsing and database
+    work run on a worker thread.
+    """
+    text = item_import.open_text(item_import.body_chunks(request.stream()))
+    report = await run_in_threadpool(item_import.import_items, text, fmt, tenant)
+    if report["error"]:
+        # The chunks before the error are committed; the report says how far
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=report)
+    return report
+
+
+# ============================================
+# BONUS: Batch - POST /batch
+# ============================================
+
+@app.post("/batch", response_model=BatchResponse)
+def run_batch(
+    request: BatchRequest,
+    tenant: Tenant = Depends(get_tenant),
+    db: Session = Depends(get_tenant_db, scope="function")
+):
+    """
+    Run up to 100 item operations in one transaction.
+
+    Each operation is {"method", "path", "body"}, e.g.
+    {"method": "POST", "path": "/items", "body": {"name": "Pen", "price": 2}},
+    and is handled by the same endpoint as a single request.
+    mode=atomic (default) commits all or nothing; mode=best_effort
+    commits the ones that succeed. See batch.py.
+    """
+    return batch.execute(app, db, request, tenant)
+
+
 # ============================================
 # SQLALCHEMY QUERY REFERENCE
 # ============================================
 """
-COMMON SQLALCHEMY QUERIES:
+COMMON SQLALCHEMY QUERIES (2.0 style):
+
+from sqlalchemy import select, update, delete, func, or_
 
 # Get all records
-db.query(Item).all()
+db.scalars(select(Item)).all()
 
 # Get first record
-db.query(Item).first()
+db.scalars(select(Item)).first()
 
 # Filter by condition
-db.query(Item).filter(Item.price > 100).all()
+db.scalars(select(Item).where(Item.price > 100)).all()
 
 # Multiple conditions (AND)
-db.query(Item).filter(Item.price > 100, Item.is_available == True).all()
+db.scalars(select(Item).where(Item.price > 100, Item.is_available == True)).all()
 
 # Filter with OR
-from sqlalchemy import or_
-db.query(Item).filter(or_(Item.price < 50, Item.price > 500)).all()
+db.scalars(select(Item).where(or_(Item.price < 50, Item.price > 500))).all()
 
 # Search (case-insensitive)
-db.query(Item).filter(Item.name.ilike("%laptop%")).all()
+db.scalars(select(Item).where(Item.name.ilike("%laptop%"))).all()
 
 # Order by
-db.query(Item).order_by(Item.price.desc()).all()
+db.scalars(select(Item).order_by(Item.price.desc())).all()
 
 # Pagination
-db.query(Item).offset(10).limit(5).all()
+db.scalars(select(Item).offset(10).limit(5)).all()
 
 # Count
-db.query(Item).count()
+db.scalar(select(func.count()).select_from(Item))
 
 # Get by ID
-db.query(Item).get(1)  # or filter(Item.id == 1).first()
+db.get(Item, 1)
+
+# Update / delete without loading the row first
+db.execute(update(Item).where(Item.id == 1).values(price=9.99))
+db.execute(delete(Item).where(Item.id == 1))
+
+The older db.query(Item).filter(...) style still works, but select()
+skips the legacy Query layer. SQLAlchemy caches the compiled SQL of each
+statement shape; GET /metrics reports db_compiled_cache_hit_ratio.
 """
 
 
@@ -325,7 +721,9 @@ Exercise 3: Add a Category model
     - Add category_id foreign key to Item
     - Create endpoints for categories
 
-Exercise 4: Add sorting
-    - Modify GET /items to accept sort_by parameter
-    - Support sorting by: name, price, created_at
+Exercise 4: Add sorting by quantity
+    - GET /items already accepts sort=name, sort=price,name, sort=-created_at
+    - Add an Index on Item.quantity in models.py
+    - Add "quantity" to ITEM_SORT_COLUMNS and ITEM_SORTS
+    - Check with EXPLAIN QUERY PLAN that there is no "USE TEMP B-TREE"
 """
@@ -7,7 +7,7 @@ Each class = One database table
 Each attribute = One column in the table
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Index, Text
 from sqlalchemy.sql import func
 from database import Base
 
@@ -46,6 +46,48 @@ class Item(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
+# ============================================
+# Extra Indexes
+# ============================================
+# These back GET /items?sort=... (see keyset.py). Each index keeps rows in
+# a sorted order, so SQLite can return them without sorting.
+# Note: create_all() does not add indexes to a table that already exists;
+# delete items.db (or use Alembic) to pick them up.
+
+Index("ix_items_created_at", Item.created_at)
+
+# Price ranges in /items/search/: price comes first, so a range is one
+# contiguous slice of the index (no separate price-only index needed)
+Index("ix_items_price_name", Item.price, Item.name)
+
+# Same for available_only=true: the equality column goes in front of
+# the range column, or SQLite could only use is_available
+Index("ix_items_available_price_name", Item.is_available, Item.price, Item.name)
+
+# Lets the analytics snapshot fetch just the rows changed since its last
+# refresh (see columnar.py)
+Index("ix_items_updated_at", Item.updated_at)
+
+
+# ============================================
+# Idempotency Records
+# ============================================
+# Stored responses of creates sent with an Idempotency-Key header (see
+# idempotency.py). Written in the same transaction as the new item.
+
+class IdempotencyRecord(Base):
+    """Response to replay when the same Idempotency-Key is sent again."""
+
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String(50), primary_key=True)  # e.g. "POST /items"
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)  # JSON body
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
 # ============================================
 # COLUMN TYPES REFERENCE
 # ============================================
@@ -0,0 +1,160 @@
+"""
+BULK REPRICING
+===============
+Change the price of every item matching a filter with one request.
+
+A price campaign through PUT /items/{id} means one request, one
+transaction and one disk sync per item. POST /items/reprice sends the
+rule to the database instead and lets it rewrite the matching rows in
+a set-based UPDATE:
+
+    UPDATE items
+       SET price = max(round(round(price * 1.1 / 0.05) * 0.05, 2), 0)
+     WHERE name LIKE 'laptop%' AND price BETWEEN 100 AND 500
+       AND <new price> != price
+
+Rows whose price would not change are left alone, so updated_at (and
+the analytics snapshot) only moves for items that really changed.
+
+Chunks
+------
+A single UPDATE over millions of rows would hold SQLite's write lock
+until it finishes, blocking every other write. Large sets are therefore
+updated in id order, REPRICE_CHUNK_SIZE rows per transaction, so other
+requests get the lock between chunks. Each chunk commits on its own: if
+one fails, the chunks before it stay applied (the response says how
+many rows were updated). A set no larger than one chunk is one UPDATE.
+
+Caches
+------
+The search index and item_stats counters are kept by triggers inside
+the UPDATE. Autocomplete ranks by availability and stock, not price, so
+it needs nothing. Anything else that holds prices in memory registers
+with @on_reprice and is called once per request, after the last chunk,
+instead of once per row (columnar.py refreshes its snapshot this way).
+
+Use dry_run=true to get the number of items that would change, with a
+few examples, without changing anything.
+"""
+
+from decimal import Decimal
+from typing import Callable, List
+
+from sqlalchemy import and_, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from metrics import Counter
+from models import Item
+from schemas import RepriceRequest
+from tenants import Tenant
+
+# Rows updated per transaction
+REPRICE_CHUNK_SIZE = 10_000
+
+# Examples returned by a dry run
+REPRICE_SAMPLE_SIZE = 10
+
+repriced_items = Counter("items_repriced_total", "Items whose price was changed by POST /items/reprice")
+
+# Called as listener(tenant, updated) after each reprice that changed something
+_listeners: List[Callable[[Tenant, int], None]] = []
+
+
+def on_reprice(listener: Callable[[Tenant, int], None]):
+    """Register a function to call once after each reprice (usable as a decorator)."""
+    _listeners.append(listener)
+    return listener
+
+
+def new_price(request: RepriceRequest):
+    """SQL expression for an item's price after the adjustment."""
+    if request.adjust == "set":
+        price = literal(request.value)
+    elif request.adjust == "add":
+        price = Item.price + request.value
+    elif request.adjust == "percent":
+        price = Item.price * (1 + request.value / 100)
+    else:
+        price = Item.price
+
+    if request.round_to is not None:
+        # Nearest multiple, then cut float noise (0.05 * 399 = 19.950000000000003)
+        # back to round_to's decimals
+        decimals = max(0, -Decimal(str(request.round_to)).as_tuple().exponent)
+        price = func.round(func.round(price / request.round_to) * request.round_to, decimals)
+
+    # Prices never go below zero (SQLite's max() with two arguments)
+    return func.max(price, 0.0)
+
+
+def _conditions(request: RepriceRequest, price) -> list:
+    """WHERE clauses: the filter, plus "the price actually changes"."""
+    conditions = [price != Item.price]
+    if request.filter.name is not None:
+        conditions.append(Item.name.ilike(request.filter.name))
+    if request.filter.min_price is not None:
+        conditions.append(Item.price >= request.filter.min_price)
+    if request.filter.max_price is not None:
+        conditions.append(Item.price <= request.filter.max_price)
+    if request.filter.is_available is not None:
+        conditions.append(Item.is_available == request.filter.is_available)
+    return conditions
+
+
+def preview(db: Session, request: RepriceRequest) -> dict:
+    """What a reprice would do, without doing it."""
+    price = new_price(request)
+    conditions = _conditions(request, price)
+    matched = db.scalar(select(func.count()).select_from(Item).where(*conditions))
+    sample = db.execute(
+        select(Item.id, Item.name, Item.price, price)
+        .where(*conditions)
+        .order_by(Item.id)
+        .limit(REPRICE_SAMPLE_SIZE)
+    ).all()
+    return {
+        "dry_run": True,
+        "matched": matched,
+        "updated": 0,
+        "chunks": 0,
+        "sample": [
+            {"id": row[0], "name": row[1], "old_price": row[2], "new_price": row[3]}
+            for row in sample
+        ]
+    }
+
+
+def apply(db: Session, request: RepriceRequest, tenant: Tenant) -> dict:
+    """Reprice the matching items, one committed chunk at a time."""
+    price = new_price(request)
+    conditions = _conditions(request, price)
+    updated = chunks = 0
+    after = 0  # Chunks walk the primary key: id > after AND id <= upper
+
+    try:
+        while True:
+            in_chunk = and_(*conditions, Item.id > after)
+            # Last id of the next full chunk; None means the rest fits in one
+            upper = db.scalar(
+                select(Item.id).where(in_chunk).order_by(Item.id)
+                .offset(REPRICE_CHUNK_SIZE - 1).limit(1)
+            )
+            stmt = update(Item).where(in_chunk).values(price=price)
+            if upper is not None:
+                stmt = stmt.where(Item.id <= upper)
+            # Plain SQL UPDATE: no rows are loaded into the session
+            result = db.execute(stmt, execution_options={"synchronize_session": False})
+            db.commit()
+            updated += result.rowcount
+            chunks += 1
+            if upper is None:
+                break
+            after = upper
+    finally:
+        # Once per request, even if a later chunk failed after some committed
+        if updated:
+            repriced_items.inc(updated)
+            for listener in _listeners:
+                listener(tenant, updated)
+
+    return {"dry_run": False, "matched": updated, "updated": updated, "chunks": chunks, "sample": []}
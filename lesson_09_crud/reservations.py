@@ -0,0 +1,210 @@
+"""
+STOCK RESERVATIONS
+===================
+Takes items out of stock safely while many clients buy at once.
+
+Reading the quantity, subtracting on the client and PUTting the result
+back loses updates: two clients both read 5, both write 4, and two units
+were sold for one. Here the database does the check and the subtraction
+in one statement:
+
+    UPDATE items
+       SET quantity = quantity - :n,
+           is_available = CASE WHEN quantity - :n > 0 THEN is_available ELSE 0 END
+     WHERE id = :id AND is_available AND quantity >= :n
+    RETURNING *
+
+No row back means there wasn't enough stock (409) or no such item
+(404), and nothing was changed. Stock can never go negative.
+
+    POST /items/{id}/reserve   {"quantity": 2}
+    POST /items/reserve        {"items": [{"item_id": 1, "quantity": 2}, ...]}
+
+A multi-item order is all or nothing: if one line is out of stock, none
+of it is reserved.
+
+Group commit
+------------
+SQLite has one write lock, and every commit waits for the disk, so one
+transaction per reservation tops out around a thousand per second with
+many buyers fighting over the lock. Reservations that arrive together
+are therefore written as one transaction: the first waiting request
+becomes the leader, applies up to MAX_GROUP_SIZE queued orders (a
+multi-item order inside its own SAVEPOINT, so a failed order doesn't
+affect the rest), commits once, and hands over to the next waiting
+request. Under light load a group is just one order, so nothing waits.
+
+bench_reserve.py compares this with read-modify-write and with one
+transaction per reservation.
+"""
+
+import threading
+import weakref
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import RowMapping, bindparam, case, select, update
+from sqlalchemy.orm import Session
+
+from metrics import Counter, Histogram
+from models import Item
+from schemas import ItemResponse
+from tenants import Tenant
+
+# Orders written per transaction at most
+MAX_GROUP_SIZE = 256
+
+reservations_total = Counter("item_reservations_total", "Reservation orders, by result", ["result"])
+reservation_group_size = Histogram(
+    "item_reservation_group_size", "Orders committed together", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+
+def merge_lines(lines: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Add up repeated items, keeping first-seen order."""
+    totals: Dict[int, int] = {}
+    for item_id, quantity in lines:
+        totals[item_id] = totals.get(item_id, 0) + quantity
+    return list(totals.items())
+
+
+# Built once and run on the Core connection: going through the ORM
+# (update(Item) ... returning(Item)) cost several times more Python
+# time than the UPDATE itself
+item_table = Item.__table__
+RESERVE = (
+    update(item_table)
+    .where(
+        item_table.c.id == bindparam("item_id"),
+        item_table.c.is_available == True,
+        item_table.c.quantity >= bindparam("n")
+    )
+    .values(
+        quantity=item_table.c.quantity - bindparam("n"),
+        is_available=case((item_table.c.quantity - bindparam("n") > 0, item_table.c.is_available), else_=False)
+    )
+    .returning(*item_table.c)
+)
+STOCK = select(item_table.c.quantity, item_table.c.is_available).where(
+    item_table.c.id == bindparam("item_id")
+)
+
+
+def reserve(db: Session, item_id: int, quantity: int) -> RowMapping:
+    """Take `quantity` of an item out of stock in the current transaction."""
+    connection = db.connection()
+    row = connection.execute(RESERVE, {"item_id": item_id, "n": quantity}).mappings().first()
+    if row is not None:
+        return row
+
+    # Only the failure path pays for a second query
+    current = connection.execute(STOCK, {"item_id": item_id}).first()
+    if current is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item with ID {item_id} not found"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "Not enough stock",
+            "item_id": item_id,
+            "requested": quantity,
+            "available": current.quantity if current.is_available else 0
+        }
+    )
+
+
+# ============================================
+# Group commit
+# ============================================
+
+class _Order:
+    def __init__(self, lines: List[Tuple[int, int]]):
+        self.lines = lines
+        self.done = False
+        self.items: List[ItemResponse] = []
+        self.error: Optional[Exception] = None
+
+
+class ReservationQueue:
+    """Queues reservation orders for one database and commits them in groups."""
+
+    def __init__(self, session_factory, suggest_index=None):
+        self._session_factory = session_factory
+        self._suggest = suggest_index
+        self._cond = threading.Condition()
+        self._queue: "deque[_Order]" = deque()
+
+    def submit(self, lines: List[Tuple[int, int]]) -> List[ItemResponse]:
+        """Reserve every (item_id, quantity) line, all or nothing."""
+        order = _Order(merge_lines(lines))
+        with self._cond:
+            self._queue.append(order)
+            while not order.done and order is not self._queue[0]:
+                self._cond.wait()
+            if not order.done:
+                # Front of the queue: lead a group of everything queued so far
+                group = [self._queue[i] for i in range(min(len(self._queue), MAX_GROUP_SIZE))]
+
+        if not order.done:
+            try:
+                self._write(group)
+            except Exception as exc:
+                for member in group:
+                    member.error = member.error or exc
+            finally:
+                with self._cond:
+                    for member in group:
+                        member.done = True
+                        self._queue.popleft()
+                    self._cond.notify_all()
+
+        if order.error is not None:
+            reservations_total.inc(result="rejected" if isinstance(order.error, HTTPException) else "failed")
+            raise order.error
+        reservations_total.inc(result="reserved")
+        return order.items
+
+    def _write(self, group: List[_Order]):
+        with self._session_factory() as db:
+            # Take the write lock up front; pysqlite would otherwise
+            # start the transaction only at the first UPDATE, after a
+            # SAVEPOINT had already opened one of its own
+            db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            for order in group:
+                # A failed single-line order changed nothing, so only
+                # multi-line orders need a savepoint to undo
+                savepoint = db.begin_nested() if len(order.lines) > 1 else None
+                try:
+                    rows = [reserve(db, item_id, quantity) for item_id, quantity in order.lines]
+                except HTTPException as exc:
+                    if savepoint is not None:
+                        savepoint.rollback()
+                    order.error = exc
+                    continue
+                if savepoint is not None:
+                    savepoint.commit()
+                order.items = [ItemResponse.model_validate(row) for row in rows]
+            db.commit()
+        reservation_group_size.observe(len(group))
+
+        # Still at the front of the queue, so updates land in commit order
+        if self._suggest is not None:
+            for order in group:
+                for item in order.items:
+                    self._suggest.upsert(item.id, item.name, item.is_available, item.quantity)
+
+
+_queues: "weakref.WeakKeyDictionary[Tenant, ReservationQueue]" = weakref.WeakKeyDictionary()
+_queues_lock = threading.Lock()
+
+
+def queue_for(tenant: Tenant) -> ReservationQueue:
+    """The reservation queue of a tenant (dropped with the tenant)."""
+    with _queues_lock:
+        queue = _queues.get(tenant)
+        if queue is None:
+            queue = _queues[tenant] = ReservationQueue(tenant.SessionLocal, tenant.suggest)
+        return queue
@@ -10,8 +10,8 @@ Why separate from SQLAlchemy models?
 This separation gives you control over what data is exposed.
 """
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, List, Literal, Optional
 from datetime import datetime
 
 
@@ -57,6 +57,142 @@ class ItemResponse(BaseModel):
         from_attributes = True  # Pydantic v2 (use orm_mode = True for v1)
 
 
+class ItemSuggestion(BaseModel):
+    """Schema for one autocomplete suggestion."""
+    id: int
+    name: str
+    is_available: bool
+    quantity: int
+
+
+# ============================================
+# Reservation Schemas
+# ============================================
+
+class ReserveRequest(BaseModel):
+    """Body of POST /items/{item_id}/reserve."""
+    quantity: int = Field(1, ge=1)
+
+
+class ReserveLine(BaseModel):
+    """One line of a multi-item order."""
+    item_id: int
+    quantity: int = Field(1, ge=1)
+
+
+class OrderRequest(BaseModel):
+    """Body of POST /items/reserve: reserved all together or not at all."""
+    items: List[ReserveLine] = Field(..., min_length=1, max_length=100)
+
+
+# ============================================
+# Reprice Schemas (POST /items/reprice)
+# ============================================
+
+class RepriceFilter(BaseModel):
+    """Which items to reprice; all given conditions must match."""
+    name: Optional[str] = None  # LIKE pattern, case-insensitive, e.g. "laptop%"
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    is_available: Optional[bool] = None
+
+
+class RepriceRequest(BaseModel):
+    """
+    Price rule for every item matching the filter.
+
+    adjust=set sets the price to value, add adds value, percent changes
+    it by value percent (-10 = 10% off) and round only rounds.
+    round_to (e.g. 0.05) then rounds to a multiple of it.
+    """
+    filter: RepriceFilter = Field(default_factory=RepriceFilter)
+    adjust: Literal["set", "add", "percent", "round"]
+    value: Optional[float] = None
+    round_to: Optional[float] = Field(None, gt=0)
+    dry_run: bool = False
+
+    @model_validator(mode="after")
+    def check_rule(self):
+        """Each adjustment needs its own input (422 otherwise)."""
+        if self.adjust == "round":
+            if self.round_to is None:
+                raise ValueError("adjust=round needs round_to")
+        elif self.value is None:
+            raise ValueError(f"adjust={self.adjust} needs a value")
+        return self
+
+
+class RepriceSample(BaseModel):
+    """One item a dry run would change."""
+    id: int
+    name: str
+    old_price: float
+    new_price: float
+
+
+class RepriceResponse(BaseModel):
+    """Items changed (or, for a dry run, that would change)."""
+    dry_run: bool
+    matched: int
+    updated: int
+    chunks: int  # Transactions used
+    sample: List[RepriceSample] = []
+
+
+# ============================================
+# Import Schemas (POST /items/import)
+# ============================================
+
+class ImportReject(BaseModel):
+    """A row that was skipped, and why."""
+    line: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    """Totals of one import; rejects lists only the first 100."""
+    rows: int
+    inserted: int
+    updated: int
+    rejected: int
+    chunks: int  # Transactions used
+    last_line: int  # Last line read (and imported)
+    error: Optional[str] = None  # Why the file couldn't be read to the end
+    rejects: List[ImportReject]
+
+
+# ============================================
+# Batch Schemas (POST /batch)
+# ============================================
+
+class BatchOperation(BaseModel):
+    """One call inside POST /batch, e.g. PUT /items/3 with an ItemUpdate body."""
+    method: str  # POST, GET, PUT or DELETE
+    path: str
+    body: Optional[dict] = None
+
+
+class BatchRequest(BaseModel):
+    """Operations to run in order in one transaction."""
+    mode: Literal["atomic", "best_effort"] = "atomic"
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=100)
+
+
+class BatchResult(BaseModel):
+    """Outcome of one operation: ok, failed, rolled_back or skipped."""
+    index: int
+    outcome: str
+    status: Optional[int] = None  # Status code the endpoint returned
+    body: Any = None  # Its response body (or {"detail": ...} on errors)
+
+
+class BatchResponse(BaseModel):
+    """Per-operation results; committed is False if an atomic batch failed."""
+    mode: str
+    committed: bool
+    results: List[BatchResult]
+
+
 # ============================================
 # WHY USE from_attributes = True?
 # ============================================
@@ -0,0 +1,113 @@
+"""
+TRIGRAM SEARCH INDEX
+=====================
+Fast substring search over item names and descriptions.
+
+`Item.name.ilike("%lap%")` has to read every row, because a normal
+B-tree index can't help with a pattern that starts with %. SQLite's FTS5
+extension has a "trigram" tokenizer that indexes every 3-character
+slice of the text instead, so a search for "laptop" only looks at rows
+containing "lap", "apt", "pto" and "top".
+
+    items          <- the real table (SQLAlchemy model in models.py)
+    items_fts      <- FTS5 index over items.name and items.description
+
+Triggers keep items_fts in sync with every INSERT, UPDATE and DELETE on
+items, no matter which endpoint (or tool) made the change.
+
+Limitations:
+- Queries shorter than 3 characters have no trigram, so they fall back
+  to a plain LIKE scan.
+- Trigram needs SQLite 3.34+. On older versions search also falls back
+  to LIKE.
+"""
+
+import sqlite3
+
+from sqlalchemy import column, literal_column, or_, table
+
+from models import Item
+
+# Lightweight table object so the index can be used in select()
+items_fts = table("items_fts", column("rowid"))
+
+
+def _has_fts5_trigram() -> bool:
+    """Whether this SQLite build has FTS5 with the trigram tokenizer."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+    return True
+
+
+# Checked once: every database in this process uses the same SQLite
+# library. False means "use LIKE instead"
+fts_enabled = _has_fts5_trigram()
+
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        name, description,
+        content='items', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF name, description ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO items_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+
+def create_search_index(engine):
+    """
+    Create the FTS5 index and triggers, filling the index on first run.
+
+    Does nothing without FTS5 trigram support. Any other error (a locked,
+    read-only or corrupt file) is raised, not taken as "no FTS5".
+    """
+    if not fts_enabled:
+        return
+
+    with engine.begin() as conn:
+        existed = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'items_fts'"
+        ).first()
+        for ddl in FTS_DDL:
+            conn.exec_driver_sql(ddl)
+        if not existed:
+            # Index the rows that were already in items
+            conn.exec_driver_sql("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+
+
+def matching(stmt, q: str):
+    """Restrict a select(Item) statement to items whose name or description contains q."""
+    if fts_enabled and len(q) >= 3:
+        # Quoting makes q a phrase, i.e. a plain substring match;
+        # double quotes inside it are escaped by doubling them
+        phrase = '"' + q.replace('"', '""') + '"'
+        return stmt.join(items_fts, items_fts.c.rowid == Item.id).where(
+            literal_column("items_fts").op("MATCH")(phrase)
+        )
+
+    return stmt.where(or_(Item.name.ilike(f"%{q}%"), Item.description.ilike(f"%{q}%")))
@@ -0,0 +1,151 @@
+"""
+PREFIX AUTOCOMPLETE
+====================
+Typeahead suggestions for item names, answered from memory.
+
+An ilike('%...%') query per keystroke reads the whole table. Here all
+item names are kept in a Python list sorted by lowercase name, so every
+name starting with a prefix sits in one contiguous run that bisect finds
+in O(log n):
+
+    ["desk", "desk lamp", "laptop", "laptop bag", "laptop stand", "mouse"]
+                          ^-------- prefix "lap" --------^
+
+Ranking (available first, then most in stock) needs every match for a
+prefix, which is slow for one- or two-letter prefixes over a big
+catalog. So the top results per prefix are cached and patched on each
+write: a new or improved item is merged into the cached lists of its
+prefixes, and a list is only dropped (and recomputed on the next query)
+when an item that was in it gets removed or demoted.
+
+Endpoints call upsert() / remove() after they commit; bulk imports
+call reset() once instead. Each tenant has its own index (see
+tenants.py); `index` below is the default tenant's.
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import Item
+
+# Largest k a client can ask for; the cache always stores this many
+MAX_SUGGESTIONS = 20
+
+# Number of prefixes whose top results are cached
+PREFIX_CACHE_SIZE = 10_000
+
+
+def _rank(match):
+    """Sort key: available first, then highest quantity, then name (and id for ties)."""
+    key, _, is_available, quantity, item_id = match
+    return (not is_available, -quantity, key, item_id)
+
+
+class SuggestIndex:
+    """Sorted (name, id) array plus per-item ranking data."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._names: List[Tuple[str, int]] = []  # sorted by lowercase name
+        self._items: Dict[int, Tuple[str, str, bool, int]] = {}  # id -> (key, name, available, qty)
+        self._cache: "OrderedDict[str, list]" = OrderedDict()
+
+    def _ensure_loaded(self):
+        # Caller holds the lock
+        if self._loaded:
+            return
+        with self._session_factory() as db:
+            rows = db.execute(select(Item.id, Item.name, Item.is_available, Item.quantity))
+            for item_id, name, is_available, quantity in rows:
+                self._items[item_id] = (name.lower(), name, bool(is_available), quantity or 0)
+        self._names = sorted((key, item_id) for item_id, (key, *_) in self._items.items())
+        self._loaded = True
+
+    def _remove(self, item_id: int):
+        old = self._items.pop(item_id, None)
+        if old is None:
+            return
+        position = bisect_left(self._names, (old[0], item_id))
+        del self._names[position]
+
+        for length in range(len(old[0]) + 1):
+            prefix = old[0][:length]
+            top = self._cache.get(prefix)
+            if top is None or not any(match[4] == item_id for match in top):
+                continue
+            if len(top) < MAX_SUGGESTIONS:
+                # The list held every match, so it stays exact without this item
+                self._cache[prefix] = [match for match in top if match[4] != item_id]
+            else:
+                # Don't know which item would move up - recompute on next query
+                del self._cache[prefix]
+
+    def upsert(self, item_id: int, name: str, is_available: bool, quantity: Optional[int]):
+        with self._lock:
+            if not self._loaded:
+                return  # The first query loads everything from the database
+            self._remove(item_id)
+            key = name.lower()
+            entry = (key, name, bool(is_available), quantity or 0)
+            self._items[item_id] = entry
+            insort(self._names, (key, item_id))
+
+            # Adding an item can only push others out of a top list
+            for length in range(len(key) + 1):
+                prefix = key[:length]
+                top = self._cache.get(prefix)
+                if top is not None:
+                    merged = sorted(top + [entry + (item_id,)], key=_rank)
+                    self._cache[prefix] = merged[:MAX_SUGGESTIONS]
+
+    def remove(self, item_id: int):
+        with self._lock:
+            if self._loaded:
+                self._remove(item_id)
+
+    def reset(self):
+        """Forget everything; the next query reloads from the database.
+
+        Cheaper than upsert() per row after a bulk write such as an import.
+        """
+        with self._lock:
+            self._loaded = False
+            self._names = []
+            self._items = {}
+            self._cache.clear()
+
+    def suggest(self, prefix: str, limit: int) -> List[dict]:
+        """Top `limit` items whose name starts with prefix."""
+        prefix = prefix.lower()
+        with self._lock:
+            self._ensure_loaded()
+
+            top = self._cache.get(prefix)
+            if top is None:
+                start = bisect_left(self._names, (prefix,))
+                end = bisect_left(self._names, (prefix + "\U0010ffff",), lo=start)
+                matches = (
+                    self._items[self._names[i][1]] + (self._names[i][1],) for i in range(start, end)
+                )
+                top = heapq.nsmallest(MAX_SUGGESTIONS, matches, key=_rank)
+                self._cache[prefix] = top
+                if len(self._cache) > PREFIX_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(prefix)
+
+        return [
+            {"id": item_id, "name": name, "is_available": available, "quantity": quantity}
+            for _, name, available, quantity, item_id in top[:limit]
+        ]
+
+
+index = SuggestIndex()
@@ -0,0 +1,200 @@
+"""
+PER-TENANT DATABASES
+=====================
+Gives every tenant (team) its own SQLite file, so one busy team's
+writes never wait on another team's lock.
+
+Requests pick their tenant with a header:
+
+    GET /items                      -> items.db (the default tenant)
+    GET /items   X-Tenant: acme     -> tenants/acme.db
+
+The file, its tables and its search index are created the first time a
+tenant is seen. Open engines are kept in an LRU of MAX_OPEN_TENANTS
+entries; the least recently used one is disposed (closing its pooled
+connections) when a new tenant needs room, so thousands of tenants don't
+run the process out of file descriptors. An evicted tenant is simply
+reopened on its next request.
+
+A tenant is opened outside the registry lock, so other tenants' requests
+never wait for it; concurrent requests for the same tenant wait for the
+one opening it.
+
+Engine cache hits, misses, waits and evictions are exported on GET
+/metrics; a high eviction rate means MAX_OPEN_TENANTS is too small for the
+working set.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from fastapi import Depends, Header, HTTPException, status
+from sqlalchemy.orm import sessionmaker
+
+import item_stats
+import search_index
+import suggest
+from database import Base, BACKGROUND_CONNECTIONS, DB_POOL_SIZE, SessionLocal, engine, make_engine
+from metrics import Counter, Gauge
+
+TENANT_DB_DIR = "./tenants"
+TENANT_DB_URL = "sqlite:///" + TENANT_DB_DIR + "/{}.db"
+
+# Tenant engines kept open at once
+MAX_OPEN_TENANTS = int(os.getenv("MAX_OPEN_TENANTS", "64"))
+
+# Idle connections kept per tenant. Busier moments open up to
+# DB_POOL_SIZE connections (plus the background headroom, see
+# database.py), but the extra ones close when returned.
+TENANT_POOL_SIZE = 2
+
+TENANT_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+tenant_engine_cache = Counter(
+    "tenant_engine_cache_total",
+    "Tenant engine lookups: hit, miss (opened it) or wait (another request was opening it)",
+    ["result"]
+)
+tenant_engine_evictions = Counter(
+    "tenant_engine_evictions_total", "Tenant engines closed to make room for another"
+)
+
+
+class Tenant:
+    """Everything that is per tenant: engine, sessions and suggest index."""
+
+    def __init__(self, name: str, engine, session_factory, suggest_index):
+        self.name = name
+        self.engine = engine
+        self.SessionLocal = session_factory
+        self.suggest = suggest_index
+
+
+# items.db and its module-level session factory and index
+default_tenant = Tenant("default", engine, SessionLocal, suggest.index)
+
+
+def open_tenant(name: str) -> Tenant:
+    """Open (creating if needed) the database file of one tenant."""
+    os.makedirs(TENANT_DB_DIR, exist_ok=True)
+    tenant_engine = make_engine(
+        TENANT_DB_URL.format(name),
+        pool_size=TENANT_POOL_SIZE,
+        max_overflow=max(DB_POOL_SIZE - TENANT_POOL_SIZE, 0) + BACKGROUND_CONNECTIONS
+    )
+    # No-ops once the tables, index and counters exist
+    Base.metadata.create_all(bind=tenant_engine)
+    search_index.create_search_index(tenant_engine)
+    item_stats.create_item_stats(tenant_engine)
+
+    session_factory = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=tenant_engine
+    )
+    return Tenant(name, tenant_engine, session_factory, suggest.SuggestIndex(session_factory))
+
+
+class TenantRegistry:
+    """LRU of open tenants."""
+
+    def __init__(self, max_open: int = MAX_OPEN_TENANTS):
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+        self._opening: Dict[str, Future] = {}  # Tenants being opened right now
+
+    def __len__(self):
+        return len(self._tenants)
+
+    def snapshot(self) -> List[Tenant]:
+        with self._lock:
+            return list(self._tenants.values())
+
+    def get(self, name: str) -> Tenant:
+        with self._lock:
+            tenant = self._tenants.get(name)
+            if tenant is not None:
+                self._tenants.move_to_end(name)
+                tenant_engine_cache.inc(result="hit")
+                return tenant
+
+            opening = self._opening.get(name)
+            leader = opening is None
+            if leader:
+                opening = self._opening[name] = Future()
+            tenant_engine_cache.inc(result="miss" if leader else "wait")
+
+        if not leader:
+            # Another request is opening this tenant; share its result
+            return opening.result()
+
+        # Opened outside the lock: creating a new tenant's tables must not
+        # hold up requests for every other tenant
+        try:
+            tenant = open_tenant(name)
+        except BaseException as exc:
+            with self._lock:
+                del self._opening[name]
+            opening.set_exception(exc)
+            raise
+
+        evicted = []
+        with self._lock:
+            del self._opening[name]
+            self._tenants[name] = tenant
+            while len(self._tenants) > self.max_open:
+                evicted.append(self._tenants.popitem(last=False)[1])
+        opening.set_result(tenant)
+
+        for old in evicted:
+            # Requests still using it keep working; its connections
+            # are closed as they are returned
+            old.engine.dispose()
+            tenant_engine_evictions.inc()
+        return tenant
+
+
+registry = TenantRegistry()
+
+tenant_engines_open = Gauge(
+    "tenant_engines_open", "Tenant engines currently open", callback=lambda: len(registry)
+)
+
+
+def open_tenants() -> List[Tenant]:
+    """The default tenant plus every tenant whose engine is open."""
+    return [default_tenant] + registry.snapshot()
+
+
+# ============================================
+# Dependencies
+# ============================================
+
+def get_tenant(x_tenant: Optional[str] = Header(None)) -> Tenant:
+    """Resolve the request's tenant from the X-Tenant header."""
+    if x_tenant is None:
+        return default_tenant
+
+    name = x_tenant.lower()
+    if not TENANT_NAME.match(name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="X-Tenant must be 1-63 letters, digits, '-' or '_'"
+        )
+    return registry.get(name)
+
+
+def get_tenant_db(tenant: Tenant = Depends(get_tenant)):
+    """
+    Like database.get_db, but the session is bound to the request's tenant.
+
+        db: Session = Depends(get_tenant_db, scope="function")
+    """
+    db = tenant.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,280 @@
+"""
+TIME-BUCKETED ANALYTICS
+========================
+Counts of todos created and completed per hour, day or week:
+
+    GET /todos/analytics/timeseries?bucket=day&from=2026-01-01&to=2026-02-01
+
+    -> {"bucket": "day", "points": [
+           {"start": "2026-01-01T00:00:00", "created": 4, "completed": 1},
+           ...]}
+
+Each count is one GROUP BY over a range of an indexed column
+(created_at or completed_at). The index holds the timestamps in order,
+so SQLite reads only the slice between `from` and `to` and never touches
+the table itself. Archived todos (see archive.py) are counted too, so
+archiving doesn't rewrite history.
+
+Buckets in the past don't change once they are over, so their counts
+are cached and a chart refresh only queries the current bucket. The
+cache is kept honest through session hooks: completing a todo only ever
+lands in the current bucket, but deleting or un-completing one can
+change an old bucket, so that bucket is dropped from the cache once the
+transaction commits. Bulk deletes that bypass the session must call
+forget() themselves.
+
+Buckets are whole: `from` and `to` are widened to bucket boundaries.
+All times are UTC, like SQLite's CURRENT_TIMESTAMP.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, event, func, inspect, select, type_coerce
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from metrics import Counter
+from models import Todo, TodoArchive
+
+# How SQLite formats each bucket's start, plus the date modifiers that
+# move a timestamp to the start of its week (Monday)
+BUCKETS = {
+    "hour": ("%Y-%m-%d %H:00:00", ()),
+    "day": ("%Y-%m-%d 00:00:00", ()),
+    "week": ("%Y-%m-%d 00:00:00", ("-6 days", "weekday 1")),
+}
+
+# Range returned when the client gives no `from`
+DEFAULT_SPAN = {"hour": 48, "day": 30, "week": 12}
+
+# Most buckets one request may ask for
+MAX_BUCKETS = 2_000
+
+# A bucket counts as closed this long after it ends, so a transaction
+# that started just before the boundary has time to commit
+CLOSE_GRACE = timedelta(minutes=1)
+
+# Number of closed buckets kept in memory (all sizes together)
+CACHE_SIZE = 50_000
+
+SQLITE_DATETIME = "%Y-%m-%d %H:%M:%S"
+
+analytics_buckets = Counter(
+    "todo_analytics_buckets_total", "Time buckets served, by where the counts came from", ["source"]
+)
+
+
+# ============================================
+# Bucket arithmetic
+# ============================================
+
+def bucket_start(bucket: str, moment: datetime) -> datetime:
+    """Start of the bucket containing `moment` (naive UTC)."""
+    if bucket == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def bucket_step(bucket: str) -> timedelta:
+    return {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}[bucket]
+
+
+def _utc(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def bucket_range(bucket: str, start: Optional[datetime], end: Optional[datetime]) -> List[datetime]:
+    """Starts of the whole buckets covering [start, end)."""
+    if bucket not in BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"bucket must be one of: {', '.join(BUCKETS)}"
+        )
+    step = bucket_step(bucket)
+    if end is None:
+        last = bucket_start(bucket, _now())
+    else:
+        end = _utc(end)
+        last = bucket_start(bucket, end)
+        if last == end:
+            last -= step  # `to` is exclusive
+    first = bucket_start(bucket, _utc(start)) if start is not None else last - step * (DEFAULT_SPAN[bucket] - 1)
+
+    if first > last:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="from must be before to")
+    if (last - first) // step + 1 > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many {bucket} buckets; ask for at most {MAX_BUCKETS}"
+        )
+
+    starts = []
+    while first <= last:
+        starts.append(first)
+        first += step
+    return starts
+
+
+# ============================================
+# SQL
+# ============================================
+
+def _count_by_bucket(db: Session, column, bucket: str, start: datetime, end: datetime) -> Dict[str, int]:
+    """{bucket start text: rows} for rows with start <= column < end."""
+    fmt, modifiers = BUCKETS[bucket]
+    label = func.strftime(fmt, column, *modifiers)
+    # Compare as the stored text so the bounds are exact (see keyset.py)
+    text = type_coerce(column, String)
+    rows = db.execute(
+        select(label, func.count())
+        .where(text >= start.strftime(SQLITE_DATETIME), text < end.strftime(SQLITE_DATETIME))
+        .group_by(label)
+    )
+    return dict(rows.all())
+
+
+def _query(db: Session, bucket: str, start: datetime, end: datetime) -> Dict[datetime, Tuple[int, int]]:
+    created, completed = {}, {}
+    for model in (Todo, TodoArchive):
+        for totals, column in ((created, model.created_at), (completed, model.completed_at)):
+            for key, rows in _count_by_bucket(db, column, bucket, start, end).items():
+                totals[key] = totals.get(key, 0) + rows
+
+    counts = {}
+    moment = start
+    while moment < end:
+        key = moment.strftime(SQLITE_DATETIME)
+        counts[moment] = (created.get(key, 0), completed.get(key, 0))
+        moment += bucket_step(bucket)
+    return counts
+
+
+# ============================================
+# Cache of closed buckets
+# ============================================
+
+class BucketCache:
+    """LRU of (bucket, start) -> (created, completed) for closed buckets."""
+
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, datetime], Tuple[int, int]]" = OrderedDict()
+        self.max_entries = max_entries
+        # Bumped by invalidate() so counts read before a commit are not
+        # stored after it
+        self.generation = 0
+
+    def get_many(self, bucket: str, starts: List[datetime]) -> Dict[datetime, Tuple[int, int]]:
+        found = {}
+        with self._lock:
+            for start in starts:
+                counts = self._entries.get((bucket, start))
+                if counts is not None:
+                    self._entries.move_to_end((bucket, start))
+                    found[start] = counts
+        return found
+
+    def put_many(self, bucket: str, counts: Dict[datetime, Tuple[int, int]], generation: int):
+        with self._lock:
+            if generation != self.generation:
+                return
+            for start, value in counts.items():
+                self._entries[(bucket, start)] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, moments: Iterable[datetime]):
+        """Drop every cached bucket (of any size) containing one of `moments`."""
+        with self._lock:
+            self.generation += 1
+            for moment in moments:
+                for bucket in BUCKETS:
+                    self._entries.pop((bucket, bucket_start(bucket, _utc(moment))), None)
+
+
+cache = BucketCache()
+
+
+def timeseries(db: Session, bucket: str, start: Optional[datetime], end: Optional[datetime]) -> List[dict]:
+    """Created/completed counts for each bucket in [start, end)."""
+    starts = bucket_range(bucket, start, end)
+    step = bucket_step(bucket)
+    closed_before = _now() - CLOSE_GRACE
+
+    counts = cache.get_many(bucket, starts)
+    analytics_buckets.inc(len(counts), source="cache")
+    missing = [moment for moment in starts if moment not in counts]
+
+    if missing:
+        generation = cache.generation
+        # One query over the span from the first missing bucket; usually
+        # that is just the current one
+        fresh = _query(db, bucket, missing[0], starts[-1] + step)
+        analytics_buckets.inc(len(fresh), source="db")
+        counts.update(fresh)
+        cache.put_many(bucket, {
+            moment: value for moment, value in fresh.items() if moment + step <= closed_before
+        }, generation)
+
+    return [
+        {"start": moment, "created": counts[moment][0], "completed": counts[moment][1]}
+        for moment in starts
+    ]
+
+
+# ============================================
+# Keeping completed_at and the cache in sync
+# ============================================
+
+def _stale(session: Session) -> List[datetime]:
+    return session.info.setdefault("analytics_stale", [])
+
+
+def forget(db: Session, moments: Iterable[Optional[datetime]]):
+    """Invalidate buckets changed by a bulk delete once the transaction commits."""
+    _stale(db).extend(moment for moment in moments if moment is not None)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _stamp_completed_at(session: Session, flush_context, instances):
+    stale = _stale(session)
+    for obj in session.new:
+        if isinstance(obj, Todo) and obj.completed:
+            obj.completed_at = func.now()
+
+    for obj in session.dirty:
+        if not isinstance(obj, Todo) or not inspect(obj).attrs.completed.history.has_changes():
+            continue
+        if obj.completed_at is not None:
+            # Un-completing (or re-completing) moves it out of an old bucket
+            stale.append(obj.completed_at)
+        obj.completed_at = func.now() if obj.completed else None
+
+    for obj in session.deleted:
+        if isinstance(obj, Todo):
+            stale.extend(moment for moment in (obj.created_at, obj.completed_at) if moment is not None)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_invalidations(session: Session):
+    stale = session.info.pop("analytics_stale", None)
+    if stale:
+        cache.invalidate(stale)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_invalidations(session: Session):
+    session.info.pop("analytics_stale", None)
@@ -0,0 +1,116 @@
+"""
+HOT/COLD ARCHIVAL
+==================
+Moves completed todos that nobody has touched in a while out of the
+`todos` table and into `todos_archive`.
+
+Queries about active work only ever read `todos`, and its B-tree (and
+every index on it) stays the size of the active work instead of growing
+forever. The archive has the same columns, so nothing is lost:
+
+    GET /todos?include_archived=true
+    GET /todos/42?include_archived=true
+    GET /todos/search?q=report&include_archived=true
+
+The job runs in the background every ARCHIVE_INTERVAL_SECONDS and moves
+ARCHIVE_BATCH_SIZE rows per transaction (INSERT ... SELECT, then
+DELETE), so writers are never locked out for long.
+
+Archived todos are read-only: PUT, DELETE and sync only see `todos`.
+Archiving is not a delete, so it adds nothing to the change log or sync
+tombstones - clients simply keep their copy. GET /todos/stats counts
+active todos only; the analytics endpoint counts both tables.
+"""
+
+from sqlalchemy import cast, delete, func, insert, null, select, union_all
+from sqlalchemy.orm import aliased
+
+from background import PeriodicTask
+from database import SessionLocal
+from models import Todo, TodoArchive
+
+# Completed todos older than this are archived (30 days)
+ARCHIVE_AFTER_SECONDS = 30 * 24 * 60 * 60
+
+# Rows moved per transaction
+ARCHIVE_BATCH_SIZE = 500
+
+# How often the background archival runs (0 disables it)
+ARCHIVE_INTERVAL_SECONDS = 60 * 60
+
+# Columns the two tables share
+SHARED_COLUMNS = [column.name for column in Todo.__table__.columns]
+
+
+def archive_completed(
+    older_than_seconds: int = ARCHIVE_AFTER_SECONDS,
+    batch_size: int = ARCHIVE_BATCH_SIZE
+) -> dict:
+    """Move todos completed more than `older_than_seconds` ago to the archive."""
+    cutoff = func.datetime("now", f"-{int(older_than_seconds)} seconds")
+    moved = 0
+
+    while True:
+        with SessionLocal() as db:
+            # Take the write lock before choosing rows; pysqlite would
+            # otherwise begin only at the INSERT, so a todo reopened or
+            # edited in between would still be moved
+            db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+            # Range scan on the completed_at index, oldest first
+            ids = db.scalars(
+                select(Todo.id)
+                .where(Todo.completed == True, Todo.completed_at < cutoff)
+                .order_by(Todo.completed_at)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                break
+
+            columns = [Todo.__table__.c[name] for name in SHARED_COLUMNS]
+            db.execute(
+                insert(TodoArchive).from_select(SHARED_COLUMNS, select(*columns).where(Todo.id.in_(ids)))
+            )
+            db.execute(
+                delete(Todo).where(Todo.id.in_(ids)).execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+
+    return {"archived": moved}
+
+
+archive_task = PeriodicTask("todo-archival", ARCHIVE_INTERVAL_SECONDS, archive_completed)
+
+
+# ============================================
+# Reading hot and cold rows together
+# ============================================
+
+def with_archived():
+    """
+    An entity over `todos UNION ALL todos_archive`.
+
+    Use it in place of Todo in a select(); rows load as TodoArchive
+    objects, with archived_at set only for archived ones.
+    """
+    hot = select(
+        *[Todo.__table__.c[name] for name in SHARED_COLUMNS],
+        cast(null(), TodoArchive.archived_at.type).label("archived_at")
+    )
+    cold = select(
+        *[TodoArchive.__table__.c[name] for name in SHARED_COLUMNS],
+        TodoArchive.archived_at
+    )
+    return aliased(TodoArchive, union_all(hot, cold).subquery("all_todos"))
+
+
+def get(db, todo_id: int, include_archived: bool = False):
+    """Look a todo up by id, falling back to the archive if asked to."""
+    todo = db.get(Todo, todo_id)
+    if todo is None and include_archived:
+        todo = db.get(TodoArchive, todo_id)
+    return todo
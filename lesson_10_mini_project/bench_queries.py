@@ -0,0 +1,94 @@
+"""
+QUERY OVERHEAD BENCHMARK
+=========================
+Compares the Python cost of building and running the hot queries the
+old way (db.query) and the new way (select, db.get). lambda_stmt() is
+measured too: it was tried and rejected, since re-analysing its
+closures cost more than building the select() it caches.
+
+Runs against a throwaway in-memory database, so todos.db is untouched.
+
+To run:
+    python bench_queries.py
+"""
+
+import timeit
+
+from sqlalchemy import create_engine, lambda_stmt, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import Todo
+
+ROWS = 1_000
+REPEAT = 2_000
+
+
+def make_session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([Todo(title=f"Todo {i}", priority=i % 3 + 1, completed=i % 2 == 0) for i in range(ROWS)])
+    db.commit()
+    return db
+
+
+# ============================================
+# The queries, old and new
+# ============================================
+
+def list_legacy(db, completed=True, priority=2, skip=0, limit=20):
+    query = db.query(Todo)
+    query = query.filter(Todo.completed == completed)
+    query = query.filter(Todo.priority == priority)
+    return query.offset(skip).limit(limit).all()
+
+
+def list_select(db, completed=True, priority=2, skip=0, limit=20):
+    stmt = select(Todo).where(Todo.completed == completed, Todo.priority == priority)
+    return db.scalars(stmt.offset(skip).limit(limit)).all()
+
+
+def list_lambda(db, completed=True, priority=2, skip=0, limit=20):
+    # Not used by the endpoints: slower than list_select (see solution.py)
+    stmt = lambda_stmt(lambda: select(Todo))
+    stmt += lambda s: s.where(Todo.completed == completed)
+    stmt += lambda s: s.where(Todo.priority == priority)
+    stmt += lambda s: s.offset(skip).limit(limit)
+    return db.scalars(stmt).all()
+
+
+def get_legacy(db, todo_id=500):
+    return db.query(Todo).filter(Todo.id == todo_id).first()
+
+
+def get_select(db, todo_id=500):
+    return db.scalars(select(Todo).where(Todo.id == todo_id)).first()
+
+
+def get_identity(db, todo_id=500):
+    return db.get(Todo, todo_id)
+
+
+def bench(label, func, db):
+    func(db)  # Warm up the compiled cache
+    seconds = min(timeit.repeat(lambda: func(db), number=REPEAT, repeat=3))
+    print(f"{label:<34} {seconds / REPEAT * 1e6:8.1f} us/call")
+
+
+if __name__ == "__main__":
+    db = make_session()
+    print(f"{ROWS} rows, best of 3 x {REPEAT} calls\n")
+
+    print("GET /todos?completed=true&priority=2")
+    bench("  db.query().filter()  (before)", list_legacy, db)
+    bench("  select().where()     (after)", list_select, db)
+    bench("  lambda_stmt()        (rejected)", list_lambda, db)
+
+    print("\nGET /todos/{id}")
+    bench("  db.query().first()   (before)", get_legacy, db)
+    bench("  select().first()", get_select, db)
+    bench("  db.get()             (after)", get_identity, db)
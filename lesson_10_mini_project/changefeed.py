@@ -0,0 +1,292 @@
+"""
+CHANGE FEED
+============
+Incremental sync for todo clients.
+
+Every mutation in solution.py appends a TodoChange row in the same
+transaction as the change itself, so the log can never disagree with
+the todos table. Clients remember the last cursor they saw and ask for
+everything after it instead of refetching GET /todos:
+
+    GET /todos/changes                    -> current cursor, no changes
+    GET /todos/changes?since=42           -> changes after cursor 42
+    GET /todos/changes?since=42&wait=30   -> long-poll up to 30 seconds
+    GET /todos/changes?since=42  (Accept: text/event-stream)  -> SSE
+
+Compaction keeps only the newest entry per todo once it is older than
+the retention window, so clients should treat "insert" and "update" the
+same way (upsert). Tombstones older than the window are purged too; a
+client whose cursor is behind that point gets 410 Gone and must do a
+full refetch.
+
+Cursor ordering relies on SQLite allowing one writer at a time: a change
+id is assigned inside the write transaction, so ids become visible in
+commit order.
+"""
+
+import asyncio
+import json
+import threading
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.orm import Session
+
+from background import PeriodicTask
+from database import SessionLocal
+from models import ChangeLogCompaction, Todo, TodoChange
+from schemas import TodoChangeResponse, TodoChangesPage, TodoResponse
+
+
+# ============================================
+# Settings
+# ============================================
+
+# Entries younger than this are never compacted (7 days)
+CHANGELOG_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+# How often the background compaction runs (0 disables it)
+COMPACTION_INTERVAL_SECONDS = 60 * 60
+
+# SSE streams send a comment line this often so proxies keep them open
+SSE_HEARTBEAT_SECONDS = 15
+
+
+class CursorExpired(Exception):
+    """The requested cursor is older than the compaction horizon."""
+
+    def __init__(self, horizon: int):
+        super().__init__(f"Cursor is older than the compaction horizon {horizon}")
+        self.horizon = horizon
+
+
+# ============================================
+# Writing changes
+# ============================================
+
+def record_change(db: Session, op: str, todo: Todo):
+    """
+    Append a change for `todo` to the log.
+
+    Call this before db.commit() so the entry lands in the same
+    transaction as the mutation.
+    """
+    # Flush first so new todos have an id and defaults are filled in
+    db.flush()
+    payload = None
+    if op != "delete":
+        payload = TodoResponse.model_validate(todo).model_dump_json()
+
+    db.add(TodoChange(todo_id=todo.id, op=op, payload=payload))
+    db.info["todo_changes"] = True
+
+
+def record_deletes(db: Session, todo_ids: List[int]):
+    """Append tombstones for a bulk delete."""
+    db.add_all([TodoChange(todo_id=todo_id, op="delete") for todo_id in todo_ids])
+    if todo_ids:
+        db.info["todo_changes"] = True
+
+
+# ============================================
+# Waking up waiting clients
+# ============================================
+
+class ChangeNotifier:
+    """
+    Wakes long-poll and SSE clients when new changes are committed.
+
+    Commits happen on worker threads while waiters live on the event
+    loop, so waking goes through call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    def subscribe(self) -> asyncio.Future:
+        waiter = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._waiters.add(waiter)
+        return waiter
+
+    def unsubscribe(self, waiter: asyncio.Future):
+        with self._lock:
+            self._waiters.discard(waiter)
+
+    def notify(self):
+        with self._lock:
+            waiters, self._waiters = self._waiters, set()
+        for waiter in waiters:
+            try:
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+    async def wait(self, waiter: asyncio.Future, timeout: float) -> bool:
+        """Wait until notified or until `timeout` seconds pass."""
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+notifier = ChangeNotifier()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _notify_after_commit(session: Session):
+    # Only wake clients once the changes are actually visible
+    if session.info.pop("todo_changes", False):
+        notifier.notify()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_after_rollback(session: Session):
+    session.info.pop("todo_changes", None)
+
+
+# ============================================
+# Reading changes
+# ============================================
+
+def _horizon(db: Session) -> int:
+    return db.scalar(select(func.max(ChangeLogCompaction.horizon))) or 0
+
+
+def _head(db: Session) -> int:
+    latest = db.scalar(select(func.max(TodoChange.id))) or 0
+    return max(latest, _horizon(db))
+
+
+def _to_response(change: TodoChange) -> TodoChangeResponse:
+    todo = None
+    if change.payload is not None:
+        todo = TodoResponse.model_validate_json(change.payload)
+    return TodoChangeResponse(
+        cursor=change.id,
+        todo_id=change.todo_id,
+        op=change.op,
+        todo=todo,
+        created_at=change.created_at,
+    )
+
+
+def fetch_changes(since: Optional[int], limit: int = 100) -> TodoChangesPage:
+    """
+    Return up to `limit` changes after `since`.
+
+    With since=None nothing is returned, only the current cursor, so a
+    new client can grab a starting point before its initial full fetch.
+    """
+    with SessionLocal() as db:
+        if since is None:
+            return TodoChangesPage(changes=[], cursor=_head(db), has_more=False)
+
+        horizon = _horizon(db)
+        if since < horizon:
+            raise CursorExpired(horizon)
+
+        rows = db.scalars(
+            select(TodoChange)
+            .where(TodoChange.id > since)
+            .order_by(TodoChange.id)
+            .limit(limit + 1)
+        ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = rows[-1].id if rows else since
+    return TodoChangesPage(
+        changes=[_to_response(row) for row in rows],
+        cursor=cursor,
+        has_more=has_more,
+    )
+
+
+async def wait_for_changes(since: Optional[int], limit: int, timeout: float) -> TodoChangesPage:
+    """Long-poll: return as soon as there is at least one change, or on timeout."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    while True:
+        # Subscribe *before* reading so a commit landing in between
+        # still wakes us up instead of being missed until the timeout
+        waiter = notifier.subscribe()
+        try:
+            page = await run_in_threadpool(fetch_changes, since, limit)
+            remaining = deadline - loop.time()
+            if page.changes or since is None or remaining <= 0:
+                return page
+            await notifier.wait(waiter, remaining)
+        finally:
+            notifier.unsubscribe(waiter)
+
+
+async def stream_changes(request, since: Optional[int], limit: int):
+    """Async generator producing Server-Sent Events for StreamingResponse."""
+    if since is None:
+        since = (await run_in_threadpool(fetch_changes, None)).cursor
+
+    while not await request.is_disconnected():
+        try:
+            page = await wait_for_changes(since, limit, SSE_HEARTBEAT_SECONDS)
+        except CursorExpired as exc:
+            yield f"event: reset\ndata: {json.dumps({'horizon': exc.horizon})}\n\n"
+            return
+
+        if not page.changes:
+            yield ": keep-alive\n\n"
+            continue
+
+        for change in page.changes:
+            yield f"id: {change.cursor}\nevent: {change.op}\ndata: {change.model_dump_json()}\n\n"
+        since = page.cursor
+
+
+# ============================================
+# Compaction
+# ============================================
+
+def compact_changelog(retention_seconds: int = CHANGELOG_RETENTION_SECONDS) -> dict:
+    """
+    Shrink the change log.
+
+    For entries older than the retention window:
+    1. Drop every entry that a newer entry for the same todo supersedes.
+    2. Drop tombstones and move the horizon past them.
+    """
+    cutoff = func.datetime("now", f"-{int(retention_seconds)} seconds")
+
+    with SessionLocal() as db:
+        latest_per_todo = select(func.max(TodoChange.id)).group_by(TodoChange.todo_id)
+        superseded = db.execute(
+            delete(TodoChange)
+            .where(TodoChange.created_at < cutoff, TodoChange.id.not_in(latest_per_todo))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        is_old_tombstone = (TodoChange.created_at < cutoff) & (TodoChange.op == "delete")
+        horizon = db.scalar(select(func.max(TodoChange.id)).where(is_old_tombstone))
+        tombstones = db.execute(
+            delete(TodoChange)
+            .where(is_old_tombstone)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        removed = superseded + tombstones
+        if removed:
+            db.add(ChangeLogCompaction(horizon=horizon or _horizon(db), removed=removed))
+        db.commit()
+
+    return {"removed": removed, "superseded": superseded, "tombstones": tombstones}
+
+
+compaction_task = PeriodicTask("changelog-compaction", COMPACTION_INTERVAL_SECONDS, compact_changelog)
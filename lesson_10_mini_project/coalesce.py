@@ -0,0 +1,126 @@
+"""
+REQUEST COALESCING
+===================
+Single-flight execution for expensive, identical reads.
+
+When a dashboard refreshes, hundreds of identical GET /todos/stats calls
+can arrive within milliseconds. Instead of running the same SQL hundreds
+of times, the first request (the "leader") runs it and everyone else
+asking for the same key waits for that one result.
+
+Optionally, the result is kept for a short TTL. To avoid every request
+missing at the same moment when the entry expires (a "cache stampede"),
+entries are refreshed early with a probability that grows as expiry
+approaches (the XFetch algorithm): requests that draw a refresh become
+leaders while the rest keep getting the cached value.
+
+Usage:
+    stats = Coalescer("stats")
+    stats.run(("stats",), compute_stats, ttl=1.0)
+
+The computed value is shared between requests, so return plain data
+(dicts, Pydantic models) - never ORM objects tied to one session.
+"""
+
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from metrics import Counter
+
+coalesce_leaders = Counter(
+    "coalesce_leaders_total", "Computations actually executed", ["name"]
+)
+coalesce_shared = Counter(
+    "coalesce_shared_total", "Requests that waited for another request's result", ["name"]
+)
+coalesce_cache_hits = Counter(
+    "coalesce_cache_hits_total", "Requests answered from the short-TTL cache", ["name"]
+)
+
+
+class _Flight:
+    """A computation in progress that other requests can wait on."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class _Entry:
+    __slots__ = ("value", "delta", "expires")
+
+    def __init__(self, value, delta: float, expires: float):
+        self.value = value
+        self.delta = delta  # How long the computation took
+        self.expires = expires
+
+
+class Coalescer:
+    """Runs at most one computation per key at a time and shares the result."""
+
+    def __init__(self, name: str, max_entries: int = 1024, beta: float = 1.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.beta = beta  # >1 refreshes earlier, <1 later
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._cache = OrderedDict()
+
+    def _fresh(self, entry: _Entry, now: float) -> bool:
+        # XFetch: -log(random()) is exponentially distributed, so slow
+        # computations and entries close to expiry refresh earlier
+        jitter = entry.delta * self.beta * -math.log(1.0 - random.random())
+        return now + jitter < entry.expires
+
+    def run(self, key: Hashable, compute: Callable[[], object], ttl: float = 0.0):
+        """Return compute()'s result, sharing it with concurrent callers."""
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and self._fresh(entry, now):
+                coalesce_cache_hits.inc(name=self.name)
+                return entry.value
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            elif entry is not None and now < entry.expires:
+                # Someone is already refreshing early; the current value
+                # is still valid, so don't wait for them
+                coalesce_cache_hits.inc(name=self.name)
+                return entry.value
+
+        if not leader:
+            coalesce_shared.inc(name=self.name)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        coalesce_leaders.inc(name=self.name)
+        started = time.monotonic()
+        try:
+            flight.value = compute()
+            return flight.value
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None and ttl > 0:
+                    self._cache[key] = _Entry(flight.value, finished - started, finished + ttl)
+                    self._cache.move_to_end(key)
+                    if len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+            flight.done.set()
@@ -4,20 +4,49 @@ DATABASE CONFIGURATION
 Database setup for the Todo List API.
 """
 
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 # SQLite database file
 SQLALCHEMY_DATABASE_URL = "sqlite:///./todos.db"
 
+# Connection pool size. The worker threadpool is sized to match (see
+# threadpool.py) so a thread never sits waiting for a free connection.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+
+
+def make_engine(url: str, pool_size: int = DB_POOL_SIZE):
+    """Create an engine for one SQLite file with this app's settings."""
+    new_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        # A little headroom for background jobs and the async change feed,
+        # which use connections outside the worker threadpool
+        max_overflow=5
+    )
+    event.listen(new_engine, "connect", _set_auto_vacuum)
+    return new_engine
+
+
+def _set_auto_vacuum(dbapi_connection, connection_record):
+    # Lets maintenance.py release free pages bit by bit. SQLite only
+    # applies this while the file has no tables yet, so existing
+    # databases keep their mode until a full VACUUM.
+    dbapi_connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+
 # Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False keeps loaded values readable after the session
+# is closed, so get_db can close it before the response is serialized
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 
 # Base class for models
 class Base(DeclarativeBase):
@@ -25,7 +54,19 @@ class Base(DeclarativeBase):
 
 
 def get_db():
-    """Dependency that provides database session."""
+    """
+    Dependency that provides a database session.
+
+    The session only takes a pooled connection when its first query
+    runs, so requests that fail validation, hit a cache or return early
+    never hold one.
+
+    Declare it with scope="function" so the session is closed, and its
+    connection returned to the pool, as soon as the endpoint returns -
+    not after the response has been serialized and sent:
+
+        db: Session = Depends(get_db, scope="function")
+    """
     db = SessionLocal()
     try:
         yield db
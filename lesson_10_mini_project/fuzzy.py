@@ -0,0 +1,285 @@
+"""
+FUZZY TITLE SEARCH
+===================
+Typo-tolerant search: "lern fastapi" still finds "Learn FastAPI".
+
+Comparing the query against every title with Levenshtein (edit)
+distance would mean reading the whole table on every search. Instead,
+titles live in an in-memory BK-tree, which uses the triangle inequality
+to skip most of the tree: if the query is 5 edits from a node and we
+allow 2 edits, only children 3..7 edits away from that node can match.
+
+Both whole titles and their individual words are indexed. A query
+matches a todo if the whole query is close to the whole title, or if
+every word of the query is close to some word of the title (the edits
+are added up), so "oat mlik" finds "Buy oat milk".
+
+The index follows the database through session hooks: changes are
+collected at flush time and applied only after the transaction commits,
+so a rolled-back change never shows up in search results. Bulk deletes
+that bypass the session must call forget() themselves.
+
+Archived todos (see archive.py) stay in the index, so searches with
+include_archived=true find them too; plain searches just don't load them.
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Todo, TodoArchive
+
+WORD = re.compile(r"\w{3,}")
+
+# Ids per IN (...) list when fetching matches (well under SQLite's
+# limit on bound parameters)
+FETCH_CHUNK_SIZE = 500
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Number of single-character inserts, deletes or substitutions to turn a into b."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,                      # delete
+                current[j - 1] + 1,                   # insert
+                previous[j - 1] + (char_a != char_b)  # substitute
+            ))
+        previous = current
+    return previous[-1]
+
+
+def index_keys(title: str) -> Set[str]:
+    """The strings a title is indexed under: the whole title and each word."""
+    title = title.lower().strip()
+    return {title, *WORD.findall(title)}
+
+
+class _Node:
+    __slots__ = ("key", "ids", "children")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.ids: Set[int] = set()
+        self.children: Dict[int, "_Node"] = {}
+
+
+class BKTree:
+    """
+    BK-tree of index keys, each key pointing at the todo ids that use it.
+
+    BK-trees can't unlink nodes, so removing the last id from a key just
+    leaves an empty node behind; the tree is rebuilt once empty nodes
+    outnumber live ones.
+    """
+
+    def __init__(self):
+        self._root = None
+        self._nodes: Dict[str, _Node] = {}
+        self._keys_by_id: Dict[int, Set[str]] = {}
+        self._empty = 0
+
+    def __len__(self):
+        return len(self._keys_by_id)
+
+    def _node_for(self, key: str) -> _Node:
+        node = self._nodes.get(key)
+        if node is not None:
+            return node
+
+        new = self._nodes[key] = _Node(key)
+        if self._root is None:
+            self._root = new
+            return new
+
+        node = self._root
+        while True:
+            distance = levenshtein(key, node.key)
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = new
+                return new
+            node = child
+
+    def add(self, todo_id: int, title: str):
+        self.remove(todo_id)
+        keys = index_keys(title)
+        for key in keys:
+            if key in self._nodes and not self._nodes[key].ids:
+                self._empty -= 1  # Reviving an empty node
+            self._node_for(key).ids.add(todo_id)
+        self._keys_by_id[todo_id] = keys
+
+    def remove(self, todo_id: int):
+        for key in self._keys_by_id.pop(todo_id, ()):
+            node = self._nodes[key]
+            node.ids.discard(todo_id)
+            if not node.ids:
+                self._empty += 1
+
+        if self._empty > len(self._nodes) - self._empty:
+            self._rebuild()
+
+    def _rebuild(self):
+        entries = {todo_id: keys for todo_id, keys in self._keys_by_id.items()}
+        self._root = None
+        self._nodes = {}
+        self._empty = 0
+        for todo_id, keys in entries.items():
+            for key in keys:
+                self._node_for(key).ids.add(todo_id)
+
+    def search(self, query: str, max_distance: int) -> Dict[int, int]:
+        """Return {todo_id: best distance} for keys within max_distance of query."""
+        query = query.lower().strip()
+        found: Dict[int, int] = {}
+        stack = [self._root] if self._root is not None else []
+
+        while stack:
+            node = stack.pop()
+            distance = levenshtein(query, node.key)
+            if distance <= max_distance:
+                for todo_id in node.ids:
+                    if distance < found.get(todo_id, max_distance + 1):
+                        found[todo_id] = distance
+            # Triangle inequality: only these children can be close enough
+            for edge, child in node.children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+
+        return found
+
+
+class FuzzyIndex:
+    """Thread-safe BK-tree of todo titles, loaded from the database on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = BKTree()
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        # Caller holds the lock
+        if self._loaded:
+            return
+        with SessionLocal() as db:
+            for model in (Todo, TodoArchive):
+                for todo_id, title in db.execute(select(model.id, model.title)):
+                    self._tree.add(todo_id, title)
+        self._loaded = True
+
+    def apply(self, upserts: Iterable[Tuple[int, str]], deletes: Iterable[int]):
+        with self._lock:
+            if not self._loaded:
+                return  # The first search loads everything from the database
+            for todo_id, title in upserts:
+                self._tree.add(todo_id, title)
+            for todo_id in deletes:
+                self._tree.remove(todo_id)
+
+    def search(self, query: str, max_distance: int) -> Dict[int, int]:
+        """Return {todo_id: edit distance} for todos matching query."""
+        with self._lock:
+            self._ensure_loaded()
+            found = self._tree.search(query, max_distance)
+
+            words = WORD.findall(query.lower())
+            if len(words) > 1:
+                per_word = [self._tree.search(word, max_distance) for word in words]
+                for todo_id in set(per_word[0]).intersection(*per_word[1:]):
+                    total = sum(matches[todo_id] for matches in per_word)
+                    if total < found.get(todo_id, max_distance + 1):
+                        found[todo_id] = total
+
+            return found
+
+
+index = FuzzyIndex()
+
+
+# ============================================
+# Keeping the index in sync
+# ============================================
+
+def _pending(session: Session) -> Tuple[List[Tuple[int, str]], List[int]]:
+    return session.info.setdefault("fuzzy_pending", ([], []))
+
+
+def forget(db: Session, todo_ids: Iterable[int]):
+    """Drop todos removed with a bulk delete once the transaction commits."""
+    _pending(db)[1].extend(todo_ids)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    upserts, deletes = _pending(session)
+    for obj in session.new:
+        if isinstance(obj, Todo):
+            upserts.append((obj.id, obj.title))
+    for obj in session.dirty:
+        if isinstance(obj, Todo) and session.is_modified(obj, include_collections=False):
+            upserts.append((obj.id, obj.title))
+    for obj in session.deleted:
+        if isinstance(obj, Todo):
+            deletes.append(obj.id)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_changes(session: Session):
+    upserts, deletes = session.info.pop("fuzzy_pending", ([], []))
+    if upserts or deletes:
+        index.apply(upserts, deletes)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop("fuzzy_pending", None)
+
+
+def search(db: Session, query: str, max_distance: int, limit: int, model=Todo) -> List[Todo]:
+    """Todos whose title (or a word in it) is within max_distance edits of query.
+
+    Closest matches come first; ties go to the most recently updated todo.
+    Pass archive.with_archived() as `model` to include archived todos.
+
+    A short query can match tens of thousands of todos, so candidates
+    are ranked by distance in memory and the database is only asked for
+    enough of each distance tier, in bounded id chunks, to fill `limit`.
+    """
+    distances = index.search(query, max_distance)
+    tiers: Dict[int, List[int]] = {}
+    for todo_id, distance in distances.items():
+        tiers.setdefault(distance, []).append(todo_id)
+
+    recency = func.coalesce(model.updated_at, model.created_at)
+    ranked: List[int] = []
+    for distance in sorted(tiers):
+        wanted = limit - len(ranked)
+        if wanted <= 0:
+            break
+        # Newest `wanted` of each chunk; the newest of the tier are among them
+        newest = []
+        ids = tiers[distance]
+        for start in range(0, len(ids), FETCH_CHUNK_SIZE):
+            newest += db.execute(
+                select(model.id, recency)
+                .where(model.id.in_(ids[start:start + FETCH_CHUNK_SIZE]))
+                .order_by(recency.desc(), model.id.desc())
+                .limit(wanted)
+            ).all()
+        newest.sort(key=lambda row: (row[1], row[0]), reverse=True)
+        ranked += [row[0] for row in newest[:wanted]]
+
+    if not ranked:
+        return []
+    position = {todo_id: i for i, todo_id in enumerate(ranked)}
+    todos = db.scalars(select(model).where(model.id.in_(ranked))).all()
+    return sorted(todos, key=lambda todo: position[todo.id])
@@ -0,0 +1,204 @@
+"""
+DATABASE MAINTENANCE
+=====================
+Housekeeping for todos.db, run inside the API process while it is quiet.
+
+Months of inserts and deletes leave free pages scattered through the
+file, and the statistics the query planner uses to pick indexes drift
+away from the real data. These tasks fix that:
+
+    optimize            PRAGMA optimize - refreshes stats that look stale
+    analyze             ANALYZE (bounded by analysis_limit) - full stats
+    incremental_vacuum  hands free pages back to the filesystem
+
+Every MAINTENANCE_TICK_SECONDS the scheduler measures the request rate
+since the last tick. Only when it is below QUIET_REQUESTS_PER_SECOND
+(and nothing is in flight) does it run the tasks that are due.
+
+Each task has a time budget. SQLite calls a progress handler while it
+works, and the handler aborts the statement once the budget is spent,
+so a big ANALYZE can never hold the write lock for long. An aborted
+task is reported as "timeout" and simply tries again next time.
+
+Results are exported on GET /metrics and shown by
+GET /admin/maintenance.
+
+Note: incremental vacuum needs auto_vacuum=INCREMENTAL, which SQLite
+only applies to a new database file (see database.py) or after a full
+VACUUM. todos.db uses SQLite's default rollback journal; switching to
+journal_mode=WAL would also call for a PRAGMA wal_checkpoint(PASSIVE)
+task here.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from background import PeriodicTask
+from database import engine
+from metrics import Counter, Gauge, Histogram
+from ratelimit import requests_admitted, requests_in_flight
+
+# How often the scheduler checks for quiet periods (0 disables it)
+MAINTENANCE_TICK_SECONDS = 30
+
+# Request rate under which the API counts as quiet
+QUIET_REQUESTS_PER_SECOND = 1.0
+
+# SQLite calls the progress handler every this many VM instructions
+PROGRESS_HANDLER_STEPS = 10_000
+
+# Rows ANALYZE samples per index (0 would mean "read everything")
+ANALYSIS_LIMIT = 1000
+
+# Free pages released per incremental_vacuum statement
+VACUUM_PAGES_PER_STEP = 256
+
+maintenance_runs = Counter(
+    "db_maintenance_runs_total", "Maintenance task runs, by result", ["task", "result"]
+)
+maintenance_duration = Histogram(
+    "db_maintenance_duration_seconds", "Time spent in each maintenance task", ["task"]
+)
+maintenance_last_run = Gauge(
+    "db_maintenance_last_run_timestamp_seconds", "Unix time each task last finished", ["task"]
+)
+
+
+class Skipped(Exception):
+    """The task doesn't apply to this database."""
+
+
+# ============================================
+# Tasks
+# ============================================
+# Each takes the raw sqlite3 connection and the deadline (a monotonic
+# time) and returns a short description of what it did.
+
+def run_optimize(conn: sqlite3.Connection, deadline: float) -> str:
+    conn.execute("PRAGMA optimize").fetchall()
+    return "ok"
+
+
+def run_analyze(conn: sqlite3.Connection, deadline: float) -> str:
+    conn.execute(f"PRAGMA analysis_limit = {int(ANALYSIS_LIMIT)}")
+    conn.execute("ANALYZE")
+    return f"analysis_limit={ANALYSIS_LIMIT}"
+
+
+def run_incremental_vacuum(conn: sqlite3.Connection, deadline: float) -> str:
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        raise Skipped("auto_vacuum is not INCREMENTAL")
+
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    free = before
+    # Small steps, each its own short transaction, until done or out of time
+    while free and time.monotonic() < deadline:
+        conn.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})").fetchall()
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return f"released {before - free} of {before} free pages"
+
+
+class MaintenanceTask:
+    """One task, how often it is due and how long it may take."""
+
+    def __init__(self, name: str, interval: float, budget: float,
+                 func: Callable[[sqlite3.Connection, float], str]):
+        self.name = name
+        self.interval = interval
+        self.budget = budget
+        self.func = func
+        self.last_run = 0.0  # monotonic
+        self.status = {"task": name, "runs": 0, "result": None, "detail": None,
+                       "duration_seconds": None, "finished_at": None}
+
+    def due(self, now: float) -> bool:
+        return self.status["runs"] == 0 or now - self.last_run >= self.interval
+
+    def run(self):
+        """Run once within the time budget and record the outcome."""
+        start = time.monotonic()
+        deadline = start + self.budget
+
+        with engine.connect() as connection:
+            conn = connection.connection.driver_connection
+            # Returning non-zero aborts the running statement
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_HANDLER_STEPS)
+            try:
+                detail = self.func(conn, deadline)
+                result = "timeout" if time.monotonic() > deadline else "ok"
+            except Skipped as exc:
+                result, detail = "skipped", str(exc)
+            except sqlite3.OperationalError as exc:
+                if "interrupted" not in str(exc):
+                    result, detail = "failed", str(exc)
+                else:
+                    result, detail = "timeout", f"stopped after {self.budget}s"
+            finally:
+                conn.set_progress_handler(None, 0)
+
+        duration = time.monotonic() - start
+        self.last_run = time.monotonic()
+        self.status.update(
+            runs=self.status["runs"] + 1, result=result, detail=detail,
+            duration_seconds=round(duration, 4), finished_at=datetime.now(timezone.utc)
+        )
+        maintenance_runs.inc(task=self.name, result=result)
+        maintenance_duration.observe(duration, task=self.name)
+        maintenance_last_run.set(time.time(), task=self.name)
+
+
+TASKS: List[MaintenanceTask] = [
+    MaintenanceTask("optimize", interval=60 * 60, budget=1.0, func=run_optimize),
+    MaintenanceTask("analyze", interval=24 * 60 * 60, budget=5.0, func=run_analyze),
+    MaintenanceTask("incremental_vacuum", interval=6 * 60 * 60, budget=2.0, func=run_incremental_vacuum),
+]
+
+
+# ============================================
+# Scheduler
+# ============================================
+
+class MaintenanceScheduler:
+    """Runs due tasks on ticks where the request rate is low."""
+
+    def __init__(self, tasks: List[MaintenanceTask]):
+        self.tasks = tasks
+        self._lock = threading.Lock()
+        self._last_count = requests_admitted.get()
+        self._last_tick = time.monotonic()
+        self.request_rate = 0.0
+        self.quiet = False
+
+    def quiet_now(self) -> bool:
+        return self.request_rate < QUIET_REQUESTS_PER_SECOND and requests_in_flight.get() == 0
+
+    def tick(self, force: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            count = requests_admitted.get()
+            self.request_rate = (count - self._last_count) / max(now - self._last_tick, 1e-9)
+            self._last_count, self._last_tick = count, now
+            self.quiet = self.quiet_now()
+
+            for task in self.tasks:
+                # Re-check between tasks: traffic may have picked up
+                if not force and not self.quiet_now():
+                    break
+                if force or task.due(time.monotonic()):
+                    task.run()
+
+    def status(self) -> Dict:
+        return {
+            "quiet": self.quiet,
+            "request_rate": round(self.request_rate, 3),
+            "quiet_below": QUIET_REQUESTS_PER_SECOND,
+            "tasks": [task.status for task in self.tasks]
+        }
+
+
+scheduler = MaintenanceScheduler(TASKS)
+
+maintenance_task = PeriodicTask("db-maintenance", MAINTENANCE_TICK_SECONDS, scheduler.tick)
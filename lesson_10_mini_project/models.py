@@ -1,18 +1,27 @@
 """
 DATABASE MODELS
 ================
-SQLAlchemy model for the Todo table.
+SQLAlchemy models for the Todo table and its change log.
+
+Note: create_all() only creates missing tables, it never adds columns to
+existing ones. Delete todos.db after pulling new columns (or use Alembic).
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, DDL, Index, event
 from sqlalchemy.sql import func
 from database import Base
 
 
 class Todo(Base):
-    """Todo item in the database."""
+    """
+    Todo item in the database.
+
+    AUTOINCREMENT keeps SQLite from handing the id of an archived todo
+    (see archive.py) to a new one.
+    """
 
     __tablename__ = "todos"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False, index=True)
@@ -21,3 +30,128 @@ class Todo(Base):
     priority = Column(Integer, default=1)  # 1=Low, 2=Medium, 3=High
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Set when the todo is marked completed (see analytics.py)
+    completed_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # Bumped on every write from one global counter (see sync.py)
+    version = Column(Integer, nullable=False, default=0, index=True)
+
+
+# Indexes behind GET /todos?sort=... (see keyset.py). SQLite appends the
+# rowid (id) to every index, so each one also covers the id tie-breaker.
+Index("ix_todos_created_at", Todo.created_at)
+Index("ix_todos_priority_created_at", Todo.priority, Todo.created_at)
+Index("ix_todos_priority_desc_created_at", Todo.priority.desc(), Todo.created_at)
+
+
+class TodoArchive(Base):
+    """
+    Completed todos moved out of the hot `todos` table (see archive.py).
+
+    Same columns as Todo, plus when the row was archived.
+    """
+
+    __tablename__ = "todos_archive"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(200), nullable=False)
+    description = Column(String(500), nullable=True)
+    completed = Column(Boolean, default=True)
+    priority = Column(Integer, default=1)
+    created_at = Column(DateTime(timezone=True), index=True)
+    updated_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True), index=True)
+    version = Column(Integer, nullable=False, default=0)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TodoTombstone(Base):
+    """
+    Remembers deleted todo ids so offline clients can drop them too.
+
+    `version` comes from the same counter as Todo.version, so one sync
+    token covers both updates and deletes.
+    """
+
+    __tablename__ = "todo_tombstones"
+
+    todo_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SyncClock(Base):
+    """
+    Single-row counter that hands out todo versions.
+
+    Bumping it is an UPDATE, which takes SQLite's write lock, so versions
+    are handed out (and committed) strictly in order.
+    """
+
+    __tablename__ = "sync_clock"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+# Seed the single counter row as soon as the table is created
+event.listen(
+    SyncClock.__table__,
+    "after_create",
+    DDL("INSERT INTO sync_clock (id, value) VALUES (1, 0)")
+)
+
+
+class TodoChange(Base):
+    """
+    Append-only change log entry, written in the same transaction as the
+    mutation it describes.
+
+    The id doubles as the change cursor clients pass back as ?since=.
+    AUTOINCREMENT stops SQLite from reusing ids after compaction deletes
+    the newest rows, so cursors only ever move forward.
+    """
+
+    __tablename__ = "todo_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    todo_id = Column(Integer, nullable=False, index=True)
+    op = Column(String(10), nullable=False)  # insert, update or delete
+    payload = Column(Text, nullable=True)  # JSON snapshot, NULL for deletes
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class ChangeLogCompaction(Base):
+    """
+    One row per compaction run.
+
+    `horizon` is the highest cursor whose tombstones have been purged.
+    Clients asking for changes since an older cursor may have missed a
+    delete and must refetch GET /todos in full.
+    """
+
+    __tablename__ = "todo_changes_compactions"
+
+    id = Column(Integer, primary_key=True)
+    horizon = Column(Integer, nullable=False, default=0)
+    removed = Column(Integer, nullable=False, default=0)
+    ran_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class IdempotencyRecord(Base):
+    """
+    Stored response of a create sent with an Idempotency-Key header.
+
+    Written in the same transaction as the row it created, so a retry
+    either finds the record or finds nothing was created (see
+    idempotency.py).
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String(50), primary_key=True)  # e.g. "POST /todos"
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)  # JSON body
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
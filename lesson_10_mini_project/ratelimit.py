@@ -0,0 +1,228 @@
+"""
+ADMISSION CONTROL
+==================
+Keeps one noisy client from starving everyone else.
+
+Two layers, both in-process:
+
+1. Rate limiting (rate_limit dependency)
+   Every client gets a token bucket, keyed by IP address - or by API
+   key, but only for keys listed in RATE_LIMIT_API_KEYS. Keys aren't
+   checked anywhere else, so trusting any key would let a client get a
+   full bucket per request (and push everyone else's out of the LRU)
+   just by making new ones up. Each request spends tokens according to
+   its route - a search scans the table, so it costs more than a lookup
+   by id. An empty bucket means 429 Too Many Requests with a
+   Retry-After header.
+
+2. Load shedding (LoadSheddingMiddleware)
+   If too many requests are already in flight, new ones are turned
+   away with 503 Service Unavailable straight away instead of queueing
+   for a worker thread and the SQLite lock.
+
+Counters are exported through GET /metrics (see metrics.py).
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse
+
+from metrics import Counter, Gauge
+
+
+# ============================================
+# Settings
+# ============================================
+
+# Burst size and steady refill rate of each client's bucket
+RATE_LIMIT_CAPACITY = 60
+RATE_LIMIT_REFILL_PER_SECOND = 20
+
+# API keys that get their own bucket (comma-separated); any other key
+# is ignored and the caller is limited by IP address
+RATE_LIMIT_API_KEYS = frozenset(
+    key.strip() for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if key.strip()
+)
+
+# Most clients we keep buckets for; the least recently seen are dropped
+RATE_LIMIT_MAX_CLIENTS = 10_000
+
+# Tokens spent per request, keyed by (method, route path). Default is 1.
+ROUTE_COSTS = {
+    ("GET", "/todos"): 2,
+    ("GET", "/todos/search"): 5,
+    ("GET", "/todos/stats"): 3,
+    ("GET", "/todos/sync"): 5,
+    ("POST", "/todos/sync"): 5,
+    ("DELETE", "/todos/completed"): 5,
+    ("POST", "/batch"): 10,  # Up to 100 writes in one request
+}
+
+# Requests allowed in flight before new ones are shed with 503
+MAX_IN_FLIGHT = 100
+SHED_RETRY_AFTER_SECONDS = 1
+
+# Long-lived streaming endpoints wait without holding a worker thread,
+# so they don't count towards the in-flight limit
+SHED_EXEMPT_PATHS = {"/todos/changes", "/metrics"}
+
+
+# ============================================
+# Metrics
+# ============================================
+
+ratelimit_allowed = Counter(
+    "ratelimit_allowed_total", "Requests admitted by the rate limiter", ["route"]
+)
+ratelimit_rejected = Counter(
+    "ratelimit_rejected_total", "Requests rejected with 429 by the rate limiter", ["route"]
+)
+loadshed_rejected = Counter(
+    "loadshed_rejected_total", "Requests rejected with 503 by the load shedder"
+)
+requests_in_flight = Gauge(
+    "requests_in_flight", "Requests currently being handled"
+)
+requests_admitted = Counter(
+    "requests_admitted_total", "Requests let through by the load shedder (used to spot quiet periods)"
+)
+
+
+# ============================================
+# Token bucket
+# ============================================
+
+class TokenBucket:
+    """Holds up to `capacity` tokens, refilled at `rate` tokens per second."""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, cost: float, now: float) -> float:
+        """Spend `cost` tokens. Returns 0 on success, else seconds to wait."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """One token bucket per client, kept in a bounded LRU."""
+
+    def __init__(self, capacity=RATE_LIMIT_CAPACITY, rate=RATE_LIMIT_REFILL_PER_SECOND,
+                 max_clients=RATE_LIMIT_MAX_CLIENTS):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client: str, cost: float) -> float:
+        """Returns 0 if the request may proceed, else the Retry-After delay."""
+        now = time.monotonic()
+        cost = min(cost, self.capacity)
+
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.capacity, self.rate, now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            return bucket.take(cost, now)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+limiter = RateLimiter()
+
+Gauge("ratelimit_clients", "Clients with a live token bucket", callback=lambda: len(limiter))
+
+
+def client_key(request: Request) -> str:
+    """Identify the caller: a known API key, otherwise the client IP."""
+    api_key = request.headers.get("x-api-key")
+    if api_key in RATE_LIMIT_API_KEYS:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def rate_limit(request: Request):
+    """
+    Global dependency that charges the caller for this request.
+
+    Usage:
+        app = FastAPI(dependencies=[Depends(rate_limit)])
+    """
+    route = request.scope.get("route")
+    path = getattr(route, "path", request.url.path)
+    cost = ROUTE_COSTS.get((request.method, path), 1)
+
+    retry_after = limiter.check(client_key(request), cost)
+    if retry_after > 0:
+        ratelimit_rejected.inc(route=path)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+    ratelimit_allowed.inc(route=path)
+
+
+# ============================================
+# Load shedding
+# ============================================
+
+class LoadSheddingMiddleware:
+    """
+    ASGI middleware that rejects new requests once MAX_IN_FLIGHT are running.
+
+    Rejecting early is cheap; letting the request queue for a thread
+    and then time out wastes work and makes every other request slower.
+    """
+
+    def __init__(self, app, max_in_flight: int = MAX_IN_FLIGHT):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in SHED_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        # No await between the check and the increment, so this is safe
+        # on the single-threaded event loop without a lock
+        if self.in_flight >= self.max_in_flight:
+            loadshed_rejected.inc()
+            response = JSONResponse(
+                {"detail": "Server is overloaded, please retry"},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(SHED_RETRY_AFTER_SECONDS)}
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        requests_in_flight.set(self.in_flight)
+        requests_admitted.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            requests_in_flight.set(self.in_flight)
@@ -4,8 +4,8 @@ PYDANTIC SCHEMAS
 Request and response schemas for the Todo API.
 """
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Any, List, Literal, Optional
 from datetime import datetime
 
 
@@ -33,6 +33,113 @@ class TodoResponse(BaseModel):
     priority: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    archived_at: Optional[datetime] = None  # Set for archived todos only
+    version: int = 0
 
     class Config:
         from_attributes = True
+
+
+class TodoChangeResponse(BaseModel):
+    """One entry from the todo change log."""
+    cursor: int
+    todo_id: int
+    op: str  # insert, update or delete
+    todo: Optional[TodoResponse] = None  # None for deletes
+    created_at: Optional[datetime] = None
+
+
+class TodoChangesPage(BaseModel):
+    """A batch of changes plus the cursor to resume from."""
+    changes: List[TodoChangeResponse]
+    cursor: int
+    has_more: bool
+
+
+class TodoSyncChange(BaseModel):
+    """
+    One change made by an offline client.
+
+    - id=None creates a new todo (title required)
+    - otherwise base_version must match the server's current version
+    """
+    client_ref: Optional[str] = None  # Echoed back so clients can match results
+    id: Optional[int] = None
+    base_version: Optional[int] = None
+    deleted: bool = False
+    title: Optional[str] = None
+    description: Optional[str] = None
+    completed: Optional[bool] = None
+    priority: Optional[int] = None
+
+
+class TodoSyncRequest(BaseModel):
+    """Sync token from the last sync plus any local changes to push."""
+    since: int = 0  # 0 = first sync, download everything
+    limit: int = Field(500, ge=1, le=5000)
+    changes: List[TodoSyncChange] = []
+
+
+class TodoTombstoneResponse(BaseModel):
+    """A todo that was deleted on the server."""
+    id: int
+    version: int
+
+
+class TodoSyncResult(BaseModel):
+    """Outcome of one pushed change: applied, conflict, not_found or invalid."""
+    client_ref: Optional[str] = None
+    id: Optional[int] = None
+    status: str
+    todo: Optional[TodoResponse] = None  # Server copy after applying / on conflict
+
+
+class TodoSyncResponse(BaseModel):
+    """A page of server changes plus the results of pushed changes."""
+    todos: List[TodoResponse]
+    tombstones: List[TodoTombstoneResponse]
+    token: int
+    has_more: bool
+    results: List[TodoSyncResult] = []
+
+
+class TodoTimeseriesPoint(BaseModel):
+    """Todos created and completed in one time bucket."""
+    start: datetime  # Bucket start (UTC)
+    created: int
+    completed: int
+
+
+class TodoTimeseriesResponse(BaseModel):
+    """Response of GET /todos/analytics/timeseries."""
+    bucket: str  # hour, day or week
+    points: List[TodoTimeseriesPoint]
+
+
+class BatchOperation(BaseModel):
+    """One call inside POST /batch, e.g. PUT /todos/3 with a TodoUpdate body."""
+    method: str  # POST, GET, PUT or DELETE
+    path: str  # May carry a query string, e.g. /todos/3?include_archived=true
+    body: Optional[dict] = None
+
+
+class BatchRequest(BaseModel):
+    """Operations to run in order in one transaction."""
+    mode: Literal["atomic", "best_effort"] = "atomic"
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=100)
+
+
+class BatchResult(BaseModel):
+    """Outcome of one operation: ok, failed, rolled_back or skipped."""
+    index: int
+    outcome: str
+    status: Optional[int] = None  # Status code the endpoint returned
+    body: Any = None  # Its response body (or {"detail": ...} on errors)
+
+
+class BatchResponse(BaseModel):
+    """Per-operation results; committed is False if an atomic batch failed."""
+    mode: str
+    committed: bool
+    results: List[BatchResult]
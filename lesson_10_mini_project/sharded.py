@@ -0,0 +1,310 @@
+"""
+SHARDED TODO API
+=================
+The core Todo API with todos spread over several SQLite files.
+
+SQLite lets one writer at a time into a database file, so with a single
+todos.db every write in the app queues on the same lock. Here todos live
+in TODO_SHARDS files (todos_shard_0.db, todos_shard_1.db, ...), each
+with its own writer lock, so writes to different shards run in parallel.
+
+Ids stay globally unique and say which shard owns the todo:
+
+    id = sequence * TODO_SHARDS + shard        shard = id % TODO_SHARDS
+
+Each shard counts its own sequence, so creating a todo never has to
+coordinate with the other shards. New todos go to the shards in turn.
+
+- GET/PUT/DELETE /todos/{id} open a session on the owning shard only.
+- GET /todos, /todos/search and /todos/stats query every shard in
+  parallel and merge the results. Sorted lists are merged by the sort
+  key, so ?sort= and ?cursor= work exactly as in solution.py.
+
+Only the core endpoints are sharded. The change feed, sync, fuzzy
+search, analytics and archival need one ordered history and stay on the
+single-file API in solution.py.
+
+Don't change TODO_SHARDS once there is data - ids would point at the
+wrong files.
+
+To run:
+    TODO_SHARDS=4 uvicorn sharded:app --reload
+"""
+
+import heapq
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cmp_to_key
+from typing import Callable, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Response, status
+from sqlalchemy import (
+    DDL, Column, Integer, MetaData, Table, delete, event, func, select, update
+)
+from sqlalchemy.orm import Session, sessionmaker
+
+import keyset
+from database import Base, make_engine
+from models import Todo
+from schemas import TodoCreate, TodoResponse, TodoUpdate
+
+# Number of database files (set before the first run and keep it)
+TODO_SHARDS = int(os.getenv("TODO_SHARDS", "4"))
+
+SHARD_URL = "sqlite:///./todos_shard_{}.db"
+
+# Threads used to query shards in parallel
+GATHER_WORKERS = 32
+
+# Same sortable fields as solution.py; each is backed by an index
+TODO_SORT_FIELDS = ["id", "title", "priority", "created_at"]
+TODO_SORTS = ["title", "created_at", "priority,created_at", "-priority,created_at"]
+
+
+# ============================================
+# Shards
+# ============================================
+
+# Per-shard id counter (one row), bumped like sync.py's SyncClock
+shard_metadata = MetaData()
+todo_id_sequence = Table(
+    "todo_id_sequence", shard_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("value", Integer, nullable=False)
+)
+event.listen(
+    todo_id_sequence,
+    "after_create",
+    DDL("INSERT INTO todo_id_sequence (id, value) VALUES (1, 0)")
+)
+
+engines = [make_engine(SHARD_URL.format(shard)) for shard in range(TODO_SHARDS)]
+shard_sessions = [
+    sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=shard_engine)
+    for shard_engine in engines
+]
+
+for shard_engine in engines:
+    Base.metadata.create_all(bind=shard_engine, tables=[Todo.__table__])
+    shard_metadata.create_all(bind=shard_engine)
+
+executor = ThreadPoolExecutor(max_workers=GATHER_WORKERS, thread_name_prefix="shard")
+
+_round_robin = itertools.count()
+
+
+def shard_of(todo_id: int) -> int:
+    return todo_id % TODO_SHARDS
+
+
+def allocate_id(db: Session, shard: int) -> int:
+    """Next globally unique id on `shard`."""
+    sequence = db.execute(
+        update(todo_id_sequence)
+        .where(todo_id_sequence.c.id == 1)
+        .values(value=todo_id_sequence.c.value + 1)
+        .returning(todo_id_sequence.c.value)
+    ).scalar_one()
+    return sequence * TODO_SHARDS + shard
+
+
+def gather(func: Callable[[Session], object]) -> list:
+    """Run func(db) on every shard in parallel; results in shard order."""
+    def run(shard):
+        with shard_sessions[shard]() as db:
+            return func(db)
+    return list(executor.map(run, range(TODO_SHARDS)))
+
+
+def get_or_404(db: Session, todo_id: int) -> Todo:
+    todo = db.get(Todo, todo_id)
+    if todo is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Todo with ID {todo_id} not found"
+        )
+    return todo
+
+
+def set_completed(todo: Todo, completed: bool):
+    if completed != todo.completed:
+        todo.completed_at = func.now() if completed else None
+    todo.completed = completed
+
+
+def merge_sorted(pages: List[list], keys) -> list:
+    """Merge per-shard pages that are each sorted by `keys`."""
+    def compare(a, b):
+        for column, desc in keys:
+            x, y = getattr(a, column.key), getattr(b, column.key)
+            if x != y:
+                return (1 if x > y else -1) * (-1 if desc else 1)
+        return 0
+    return list(heapq.merge(*pages, key=cmp_to_key(compare)))
+
+
+# ============================================
+# App
+# ============================================
+
+app = FastAPI(
+    title="Todo List API (sharded)",
+    description=f"Core Todo API over {TODO_SHARDS} SQLite shards",
+    version="1.0.0"
+)
+
+
+@app.get("/")
+def home():
+    return {
+        "message": "Todo List API with sharded SQLite storage",
+        "shards": TODO_SHARDS,
+        "docs": "/docs"
+    }
+
+
+@app.post("/todos", response_model=TodoResponse, status_code=status.HTTP_201_CREATED)
+def create_todo(todo: TodoCreate):
+    """Create a todo on the next shard in turn."""
+    shard = next(_round_robin) % TODO_SHARDS
+    with shard_sessions[shard]() as db:
+        db_todo = Todo(
+            id=allocate_id(db, shard),
+            title=todo.title,
+            description=todo.description,
+            priority=todo.priority
+        )
+        db.add(db_todo)
+        db.commit()
+        db.refresh(db_todo)
+        return db_todo
+
+
+@app.get("/todos", response_model=List[TodoResponse])
+def get_all_todos(
+    response: Response,
+    completed: Optional[bool] = None,
+    priority: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Get todos from all shards, merged in `sort` order (default: id).
+
+    Every shard returns its first skip + limit matches, so prefer
+    cursor over skip for deep pages.
+    """
+    if cursor is not None and skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either skip or cursor, not both"
+        )
+    columns = {field: getattr(Todo, field) for field in TODO_SORT_FIELDS}
+    keys = keyset.parse_sort(sort or "id", columns, TODO_SORTS)
+
+    stmt = select(Todo)
+    if completed is not None:
+        stmt = stmt.where(Todo.completed == completed)
+    if priority is not None:
+        stmt = stmt.where(Todo.priority == priority)
+    stmt = keyset.paginate(stmt, keys, cursor).limit(skip + limit)
+
+    pages = gather(lambda db: db.scalars(stmt).all())
+    todos = merge_sorted(pages, keys)[skip:skip + limit]
+
+    if len(todos) == limit:
+        response.headers["X-Next-Cursor"] = keyset.encode_cursor(todos[-1], keys)
+    return todos
+
+
+STATS_QUERY = select(
+    func.count(),
+    func.count().filter(Todo.completed == True),
+    func.count().filter(Todo.priority == 3),
+    func.count().filter(Todo.priority == 2),
+    func.count().filter(Todo.priority == 1)
+)
+
+
+@app.get("/todos/stats")
+def get_stats():
+    """Todo statistics, summed over all shards."""
+    rows = gather(lambda db: db.execute(STATS_QUERY).one())
+    total, completed, high_priority, medium_priority, low_priority = [sum(column) for column in zip(*rows)]
+    pending = total - completed
+
+    return {
+        "total": total,
+        "completed": completed,
+        "pending": pending,
+        "completion_rate": f"{(completed/total*100):.1f}%" if total > 0 else "0%",
+        "by_priority": {
+            "high": high_priority,
+            "medium": medium_priority,
+            "low": low_priority
+        }
+    }
+
+
+@app.get("/todos/search", response_model=List[TodoResponse])
+def search_todos(q: str, limit: int = Query(50, ge=1, le=500)):
+    """
+    Search todo titles on every shard (case-insensitive), ordered by id.
+
+    Each shard returns at most `limit` matches, so a common substring
+    never pulls every match from every shard.
+    """
+    stmt = select(Todo).where(Todo.title.ilike(f"%{q}%")).order_by(Todo.id).limit(limit)
+    pages = gather(lambda db: db.scalars(stmt).all())
+    return merge_sorted(pages, [(Todo.id, False)])[:limit]
+
+
+@app.delete("/todos/completed", status_code=status.HTTP_204_NO_CONTENT)
+def delete_completed():
+    """Delete completed todos on every shard."""
+    def run(db: Session):
+        db.execute(delete(Todo).where(Todo.completed == True))
+        db.commit()
+    gather(run)
+    return None
+
+
+@app.get("/todos/{todo_id}", response_model=TodoResponse)
+def get_todo(todo_id: int):
+    with shard_sessions[shard_of(todo_id)]() as db:
+        return get_or_404(db, todo_id)
+
+
+@app.put("/todos/{todo_id}", response_model=TodoResponse)
+def update_todo(todo_id: int, todo_update: TodoUpdate):
+    with shard_sessions[shard_of(todo_id)]() as db:
+        db_todo = get_or_404(db, todo_id)
+        for field, value in todo_update.model_dump(exclude_unset=True).items():
+            if field == "completed":
+                set_completed(db_todo, value)
+            else:
+                setattr(db_todo, field, value)
+        db.commit()
+        db.refresh(db_todo)
+        return db_todo
+
+
+@app.delete("/todos/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_todo(todo_id: int):
+    with shard_sessions[shard_of(todo_id)]() as db:
+        db.delete(get_or_404(db, todo_id))
+        db.commit()
+    return None
+
+
+@app.post("/todos/{todo_id}/toggle", response_model=TodoResponse)
+def toggle_todo(todo_id: int):
+    with shard_sessions[shard_of(todo_id)]() as db:
+        db_todo = get_or_404(db, todo_id)
+        set_completed(db_todo, not db_todo.completed)
+        db.commit()
+        db.refresh(db_todo)
+        return db_todo
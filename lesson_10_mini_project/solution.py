@@ -11,7 +11,24 @@ Project Structure:
     ├── models.py      # SQLAlchemy model
     ├── schemas.py     # Pydantic schemas
     ├── starter.py     # Student template
-    └── solution.py    # This file
+    ├── solution.py    # This file
+    ├── background.py  # Periodic background jobs
+    ├── changefeed.py  # Change log, long-poll and SSE feed
+    ├── sync.py        # Delta sync for offline clients
+    ├── ratelimit.py   # Rate limiting and load shedding
+    ├── coalesce.py    # Single-flight request coalescing
+    ├── fuzzy.py       # Typo-tolerant title search (BK-tree)
+    ├── keyset.py      # Index-backed sorting and cursor pagination
+    ├── analytics.py   # Created/completed counts per hour, day or week
+    ├── archive.py     # Moves old completed todos to an archive table
+    ├── backup.py      # Online backups of todos.db
+    ├── maintenance.py # ANALYZE, vacuum etc. while the API is quiet
+    ├── idempotency.py # Idempotency-Key support for safe retries
+    ├── batch.py       # POST /batch: many operations, one transaction
+    ├── sharded.py     # Core API over several SQLite files (uvicorn sharded:app)
+    ├── metrics.py     # Prometheus-style counters for GET /metrics
+    ├── threadpool.py  # Worker threadpool sizing and metrics
+    └── bench_queries.py  # Query overhead micro-benchmark
 
 Installation:
     pip install fastapi uvicorn sqlalchemy
@@ -22,26 +39,83 @@ To run:
 API Docs: http://127.0.0.1:8000/docs
 """
 
-from fastapi import FastAPI, HTTPException, status, Depends
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, status, Depends, Header, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import List, Optional
 
 # Import from our modules
+import analytics
+import archive
+import backup
+import batch
+import changefeed
+import fuzzy
+import idempotency
+import keyset
+import maintenance
+import metrics
+import sync
+from coalesce import Coalescer
 from database import engine, get_db, Base
 from models import Todo
-from schemas import TodoCreate, TodoUpdate, TodoResponse
+from ratelimit import LoadSheddingMiddleware, rate_limit
+from threadpool import ThreadpoolWaitMiddleware, configure_threadpool, track_threadpool_wait
+from schemas import (
+    TodoCreate, TodoUpdate, TodoResponse, TodoChangesPage, TodoSyncRequest, TodoSyncResponse,
+    TodoTimeseriesResponse, BatchRequest, BatchResponse
+)
 
 
 # ============================================
 # Create App and Database Tables
 # ============================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background jobs with the app and stop them on shutdown."""
+    configure_threadpool()
+    changefeed.compaction_task.start()
+    archive.archive_task.start()
+    backup.backup_task.start()
+    maintenance.maintenance_task.start()
+    idempotency.purge_task.start()
+    yield
+    idempotency.purge_task.stop()
+    maintenance.maintenance_task.stop()
+    backup.backup_task.stop()
+    archive.archive_task.stop()
+    changefeed.compaction_task.stop()
+
+
 app = FastAPI(
     title="Todo List API",
     description="Complete Todo API with SQLAlchemy - Solution",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    dependencies=[
+        Depends(rate_limit),  # Per-client token bucket on every route
+        Depends(track_threadpool_wait)  # Time spent queueing for a worker thread
+    ]
 )
 
+# Turn requests away with 503 before they pile up (see ratelimit.py)
+app.add_middleware(LoadSheddingMiddleware)
+# Added last so it runs first and stamps the arrival time (see threadpool.py)
+app.add_middleware(ThreadpoolWaitMiddleware)
+
+# Identical concurrent stats/search requests share one query (see coalesce.py).
+# Results are reused for this many seconds; set to 0 to only coalesce.
+STATS_CACHE_TTL = 1.0
+SEARCH_CACHE_TTL = 1.0
+
+stats_flight = Coalescer("stats")
+search_flight = Coalescer("search")
+
 # Create tables in database
 Base.metadata.create_all(bind=engine)
 
@@ -64,35 +138,105 @@ def home():
             "Update": "PUT /todos/{id}",
             "Delete": "DELETE /todos/{id}",
             "Toggle": "POST /todos/{id}/toggle",
+            "Batch": "POST /batch",
             "Stats": "GET /todos/stats",
-            "Search": "GET /todos/search"
+            "Analytics": "GET /todos/analytics/timeseries?bucket=day",
+            "Search": "GET /todos/search",
+            "Changes": "GET /todos/changes?since={cursor}",
+            "Sync": "POST /todos/sync",
+            "Metrics": "GET /metrics",
+            "Backup": "POST /admin/backup"
         },
         "docs": "/docs"
     }
 
 
+# ============================================
+# Metrics Endpoint
+# ============================================
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Rate limiter, threadpool, database and other metrics in Prometheus format."""
+    return metrics.render_all()
+
+
+# ============================================
+# Admin Endpoints
+# ============================================
+
+@app.post("/admin/backup", status_code=status.HTTP_202_ACCEPTED)
+def start_backup():
+    """
+    Start an online backup of todos.db (see backup.py).
+
+    Returns immediately; poll GET /admin/backup for progress.
+    """
+    if not backup.start_backup():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A backup is already running"
+        )
+    return backup.current.as_dict()
+
+
+@app.get("/admin/backup")
+def get_backup_status():
+    """Progress of the running backup, or the result of the last one."""
+    return backup.current.as_dict()
+
+
+@app.get("/admin/maintenance")
+def get_maintenance_status():
+    """Request rate, quiet flag and the last run of each maintenance task."""
+    return maintenance.scheduler.status()
+
+
+@app.post("/admin/maintenance")
+def run_maintenance():
+    """Run every maintenance task now, quiet or not (each within its time budget)."""
+    maintenance.scheduler.tick(force=True)
+    return maintenance.scheduler.status()
+
+
 # ============================================
 # CREATE - POST /todos
 # ============================================
 
 @app.post("/todos", response_model=TodoResponse, status_code=status.HTTP_201_CREATED)
-def create_todo(todo: TodoCreate, db: Session = Depends(get_db)):
+def create_todo(
+    todo: TodoCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: Session = Depends(get_db, scope="function")
+):
     """
     Create a new todo item.
 
     - **title**: Todo title (required)
     - **description**: Optional description
     - **priority**: 1=Low, 2=Medium, 3=High (default: 1)
+
+    Send an `Idempotency-Key` header to make retries safe: repeats of
+    the same key return the first response without creating anything.
     """
-    db_todo = Todo(
-        title=todo.title,
-        description=todo.description,
-        priority=todo.priority
-    )
+    with idempotency.single_flight("POST /todos", idempotency_key):
+        stored = idempotency.replay(db, "POST /todos", idempotency_key, todo)
+        if stored is not None:
+            return stored
+
+        db_todo = Todo(
+            title=todo.title,
+            description=todo.description,
+            priority=todo.priority
+        )
 
-    db.add(db_todo)
-    db.commit()
-    db.refresh(db_todo)
+        db.add(db_todo)
+        changefeed.record_change(db, "insert", db_todo)
+        idempotency.remember(
+            db, "POST /todos", idempotency_key, todo, TodoResponse.model_validate(db_todo)
+        )
+        db.commit()
+        db.refresh(db_todo)
 
     return db_todo
 
@@ -101,13 +245,23 @@ def create_todo(todo: TodoCreate, db: Session = Depends(get_db)):
 # READ ALL - GET /todos
 # ============================================
 
+# Fields clients may sort by, and the orders an index can deliver
+# (each may also be fully reversed - see keyset.py and models.py)
+TODO_SORT_FIELDS = ["id", "title", "priority", "created_at"]
+TODO_SORTS = ["title", "created_at", "priority,created_at", "-priority,created_at"]
+
+
 @app.get("/todos", response_model=List[TodoResponse])
 def get_all_todos(
+    response: Response,
     completed: Optional[bool] = None,
     priority: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_db, scope="function")
 ):
     """
     Get all todos with optional filters.
@@ -116,18 +270,40 @@ def get_all_todos(
     - **priority**: Filter by priority (1, 2, or 3)
     - **skip**: Number of items to skip (pagination)
     - **limit**: Maximum items to return
+    - **sort**: e.g. `-priority,created_at` (- for descending)
+    - **cursor**: `X-Next-Cursor` header from the previous page; faster
+      than skip for deep pages
+    - **include_archived**: Also return archived todos (slower: the two
+      tables have to be merged before sorting)
     """
-    query = db.query(Todo)
+    model = archive.with_archived() if include_archived else Todo
+    stmt = select(model)
 
     # Apply filters
     if completed is not None:
-        query = query.filter(Todo.completed == completed)
+        stmt = stmt.where(model.completed == completed)
 
     if priority is not None:
-        query = query.filter(Todo.priority == priority)
+        stmt = stmt.where(model.priority == priority)
 
-    # Apply pagination and return
-    return query.offset(skip).limit(limit).all()
+    if sort is None and cursor is None:
+        # Apply pagination and return
+        return db.scalars(stmt.offset(skip).limit(limit)).all()
+
+    # Sorted and/or cursor pagination
+    if cursor is not None and skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either skip or cursor, not both"
+        )
+    columns = {field: getattr(model, field) for field in TODO_SORT_FIELDS}
+    keys = keyset.parse_sort(sort or "id", columns, TODO_SORTS)
+    stmt = keyset.paginate(stmt, keys, cursor).offset(skip).limit(limit)
+    todos = db.scalars(stmt).all()
+
+    if len(todos) == limit:
+        response.headers["X-Next-Cursor"] = keyset.encode_cursor(todos[-1], keys)
+    return todos
 
 
 # ============================================
@@ -135,16 +311,30 @@ def get_all_todos(
 # ============================================
 
 @app.get("/todos/stats")
-def get_stats(db: Session = Depends(get_db)):
-    """Get todo statistics."""
-    total = db.query(Todo).count()
-    completed = db.query(Todo).filter(Todo.completed == True).count()
-    pending = total - completed
+def get_stats(db: Session = Depends(get_db, scope="function")):
+    """
+    Get todo statistics.
 
-    # Priority breakdown
-    high_priority = db.query(Todo).filter(Todo.priority == 3).count()
-    medium_priority = db.query(Todo).filter(Todo.priority == 2).count()
-    low_priority = db.query(Todo).filter(Todo.priority == 1).count()
+    Concurrent calls share one computation and the result is reused
+    for STATS_CACHE_TTL seconds.
+    """
+    return stats_flight.run("stats", lambda: compute_stats(db), ttl=STATS_CACHE_TTL)
+
+
+# Built once at import time; every call reuses the same compiled SQL
+STATS_QUERY = select(
+    func.count(),
+    func.count().filter(Todo.completed == True),
+    func.count().filter(Todo.priority == 3),
+    func.count().filter(Todo.priority == 2),
+    func.count().filter(Todo.priority == 1)
+)
+
+
+def compute_stats(db: Session):
+    """Count everything in a single pass over the table."""
+    total, completed, high_priority, medium_priority, low_priority = db.execute(STATS_QUERY).one()
+    pending = total - completed
 
     return {
         "total": total,
@@ -159,18 +349,69 @@ def get_stats(db: Session = Depends(get_db)):
     }
 
 
+# ============================================
+# ANALYTICS - GET /todos/analytics/timeseries
+# ============================================
+
+@app.get("/todos/analytics/timeseries", response_model=TodoTimeseriesResponse)
+def get_timeseries(
+    bucket: str = "day",
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_db, scope="function")
+):
+    """
+    Count todos created and completed per time bucket.
+
+    - **bucket**: hour, day or week (weeks start on Monday)
+    - **from**: Start of the range, widened to a bucket boundary
+      (default: the last 48 hours / 30 days / 12 weeks)
+    - **to**: End of the range, exclusive (default: now)
+
+    Times are UTC. Counts for past buckets are cached, so only the
+    current bucket is queried on a refresh.
+    """
+    return {"bucket": bucket, "points": analytics.timeseries(db, bucket, start, end)}
+
+
 # ============================================
 # BONUS: Search
 # ============================================
 
 @app.get("/todos/search", response_model=List[TodoResponse])
-def search_todos(q: str, db: Session = Depends(get_db)):
+def search_todos(
+    q: str,
+    fuzzy_match: bool = Query(False, alias="fuzzy"),
+    max_distance: int = Query(2, ge=0, le=5),
+    limit: int = Query(50, ge=1, le=500),
+    include_archived: bool = False,
+    db: Session = Depends(get_db, scope="function")
+):
     """
     Search todos by title.
 
     - **q**: Search query (case-insensitive)
+    - **fuzzy**: Tolerate typos - match titles (or words in them) within
+      `max_distance` edits, closest and most recently updated first
+    - **max_distance**: Maximum edit distance for fuzzy mode
+    - **limit**: Maximum results to return in fuzzy mode
+    - **include_archived**: Also search archived todos
     """
-    return db.query(Todo).filter(Todo.title.ilike(f"%{q}%")).all()
+    def run_search():
+        model = archive.with_archived() if include_archived else Todo
+        if fuzzy_match:
+            todos = fuzzy.search(db, q, max_distance, limit, model)
+        else:
+            todos = db.scalars(select(model).where(model.title.ilike(f"%{q}%"))).all()
+        # Shared with other requests, so detach from this session
+        return [TodoResponse.model_validate(todo) for todo in todos]
+
+    # ilike is case-insensitive, so "Learn" and "learn" share a result
+    if fuzzy_match:
+        key = (q.lower(), fuzzy_match, max_distance, limit, include_archived)
+    else:
+        key = (q.lower(), include_archived)
+    return search_flight.run(key, run_search, ttl=SEARCH_CACHE_TTL)
 
 
 # ============================================
@@ -178,19 +419,104 @@ def search_todos(q: str, db: Session = Depends(get_db)):
 # ============================================
 
 @app.delete("/todos/completed", status_code=status.HTTP_204_NO_CONTENT)
-def delete_completed(db: Session = Depends(get_db)):
+def delete_completed(db: Session = Depends(get_db, scope="function")):
     """Delete all completed todos."""
-    db.query(Todo).filter(Todo.completed == True).delete()
+    # One DELETE ... RETURNING both removes the rows and tells us which
+    deleted = db.execute(
+        delete(Todo).where(Todo.completed == True)
+        .returning(Todo.id, Todo.created_at, Todo.completed_at)
+    ).all()
+    deleted_ids = [row.id for row in deleted]
+
+    changefeed.record_deletes(db, deleted_ids)
+    sync.record_tombstones(db, deleted_ids)
+    fuzzy.forget(db, deleted_ids)
+    analytics.forget(db, [moment for row in deleted for moment in (row.created_at, row.completed_at)])
     db.commit()
     return None
 
 
+# ============================================
+# CHANGE FEED - GET /todos/changes
+# ============================================
+
+@app.get("/todos/changes", response_model=TodoChangesPage)
+async def get_changes(
+    request: Request,
+    since: Optional[int] = None,
+    wait: float = Query(0, ge=0, le=60),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Get changes made after a cursor instead of refetching every todo.
+
+    - **since**: Cursor from the previous response (omit to get the current cursor)
+    - **wait**: Long-poll for up to this many seconds if nothing has changed yet
+    - **limit**: Maximum changes to return
+
+    Send `Accept: text/event-stream` to receive the changes as
+    Server-Sent Events instead. Returns 410 if the cursor is too old.
+    """
+    if "text/event-stream" in request.headers.get("accept", ""):
+        last_event_id = request.headers.get("last-event-id")
+        if since is None and last_event_id and last_event_id.isdigit():
+            since = int(last_event_id)
+        return StreamingResponse(
+            changefeed.stream_changes(request, since, limit),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"}
+        )
+
+    try:
+        return await changefeed.wait_for_changes(since, limit, wait)
+    except changefeed.CursorExpired as exc:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Cursor {since} has been compacted away (horizon {exc.horizon}). "
+                   "Refetch GET /todos and continue from a fresh cursor."
+        )
+
+
+# ============================================
+# DELTA SYNC - GET/POST /todos/sync
+# ============================================
+
+@app.get("/todos/sync", response_model=TodoSyncResponse)
+def pull_todos(
+    since: int = 0,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db, scope="function")
+):
+    """
+    Download todos changed and deleted since a sync token.
+
+    - **since**: `token` from the previous sync (0 for the first sync)
+    - **limit**: Page size; keep calling while `has_more` is true
+    """
+    return sync.pull_changes(db, since, limit)
+
+
+@app.post("/todos/sync", response_model=TodoSyncResponse)
+def sync_todos(request: TodoSyncRequest, db: Session = Depends(get_db, scope="function")):
+    """
+    Push local changes and pull server changes in one round trip.
+
+    Each pushed change must carry the `base_version` it was made
+    against. Stale changes come back with status "conflict" and the
+    current server copy instead of overwriting newer data.
+    """
+    results = sync.apply_changes(db, request.changes)
+    page = sync.pull_changes(db, request.since, request.limit)
+    page.results = results
+    return page
+
+
 # ============================================
 # BONUS: Get by Priority
 # ============================================
 
 @app.get("/todos/priority/{priority}", response_model=List[TodoResponse])
-def get_by_priority(priority: int, db: Session = Depends(get_db)):
+def get_by_priority(priority: int, db: Session = Depends(get_db, scope="function")):
     """
     Get todos by priority level.
 
@@ -202,7 +528,7 @@ def get_by_priority(priority: int, db: Session = Depends(get_db)):
             detail="Priority must be 1 (Low), 2 (Medium), or 3 (High)"
         )
 
-    return db.query(Todo).filter(Todo.priority == priority).all()
+    return db.scalars(select(Todo).where(Todo.priority == priority)).all()
 
 
 # ============================================
@@ -210,13 +536,17 @@ def get_by_priority(priority: int, db: Session = Depends(get_db)):
 # ============================================
 
 @app.get("/todos/{todo_id}", response_model=TodoResponse)
-def get_todo(todo_id: int, db: Session = Depends(get_db)):
+def get_todo(
+    todo_id: int,
+    include_archived: bool = False,
+    db: Session = Depends(get_db, scope="function")
+):
     """
     Get a single todo by ID.
 
-    Raises 404 if not found.
+    Raises 404 if not found (or archived, unless include_archived=true).
     """
-    todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    todo = archive.get(db, todo_id, include_archived)
 
     if todo is None:
         raise HTTPException(
@@ -235,14 +565,14 @@ def get_todo(todo_id: int, db: Session = Depends(get_db)):
 def update_todo(
     todo_id: int,
     todo_update: TodoUpdate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """
     Update an existing todo.
 
     Only updates fields that are provided.
     """
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    db_todo = db.get(Todo, todo_id)
 
     if db_todo is None:
         raise HTTPException(
@@ -255,6 +585,7 @@ def update_todo(
     for field, value in update_data.items():
         setattr(db_todo, field, value)
 
+    changefeed.record_change(db, "update", db_todo)
     db.commit()
     db.refresh(db_todo)
 
@@ -266,13 +597,13 @@ def update_todo(
 # ============================================
 
 @app.delete("/todos/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_todo(todo_id: int, db: Session = Depends(get_db)):
+def delete_todo(todo_id: int, db: Session = Depends(get_db, scope="function")):
     """
     Delete a todo by ID.
 
     Raises 404 if not found.
     """
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    db_todo = db.get(Todo, todo_id)
 
     if db_todo is None:
         raise HTTPException(
@@ -280,6 +611,7 @@ def delete_todo(todo_id: int, db: Session = Depends(get_db)):
             detail=f"Todo with ID {todo_id} not found"
         )
 
+    changefeed.record_change(db, "delete", db_todo)
     db.delete(db_todo)
     db.commit()
 
@@ -291,13 +623,13 @@ def delete_todo(todo_id: int, db: Session = Depends(get_db)):
 # ============================================
 
 @app.post("/todos/{todo_id}/toggle", response_model=TodoResponse)
-def toggle_todo(todo_id: int, db: Session = Depends(get_db)):
+def toggle_todo(todo_id: int, db: Session = Depends(get_db, scope="function")):
     """
     Toggle the completed status of a todo.
 
     If completed is True, it becomes False, and vice versa.
     """
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    db_todo = db.get(Todo, todo_id)
 
     if db_todo is None:
         raise HTTPException(
@@ -306,12 +638,58 @@ def toggle_todo(todo_id: int, db: Session = Depends(get_db)):
         )
 
     db_todo.completed = not db_todo.completed
+    changefeed.record_change(db, "update", db_todo)
     db.commit()
     db.refresh(db_todo)
 
     return db_todo
 
 
+# ============================================
+# BATCH - POST /batch
+# ============================================
+
+@app.post("/batch", response_model=BatchResponse)
+def run_batch(request: BatchRequest, db: Session = Depends(get_db, scope="function")):
+    """
+    Run up to 100 todo operations in one transaction.
+
+    Each operation is {"method", "path", "body"} and is handled by the
+    same endpoint as a single request. mode=atomic (default) commits all
+    or nothing; mode=best_effort commits the ones that succeed. See
+    batch.py.
+    """
+    return batch.execute(app, db, request)
+
+
+# ============================================
+# QUERY NOTES
+# ============================================
+"""
+Why select() instead of db.query()?
+
+SQLAlchemy caches the compiled SQL of every statement, keyed by its
+structure. Building a statement still costs Python time on every
+request, and db.query() adds a layer of legacy Query machinery on top.
+
+- select() / delete() build a Core statement directly
+- Module-level statements (STATS_QUERY) are built once at import time
+- db.get(Todo, id) checks the session's identity map before querying
+
+lambda_stmt() can cache statement construction too, but re-analysing
+the closures on each call made GET /todos slower, not faster, in
+bench_queries.py - so the list endpoint uses plain select().
+
+Writes still go through the ORM (db.add, setattr, db.delete) because the
+change log and sync versions hook into the session's flush.
+
+Measure it:
+    python bench_queries.py
+
+Cache hit ratio is exported on GET /metrics as db_compiled_cache_hit_ratio.
+"""
+
+
 # ============================================
 # TESTING GUIDE
 # ============================================
@@ -326,12 +704,20 @@ TEST YOUR API:
    {"title": "Build project", "priority": 2}
    {"title": "Review code", "priority": 1}
 
+   Retry-safe create (same key -> same todo, created once):
+   POST /todos   with header  Idempotency-Key: 5f0c7b2e
+
 3. Get all todos:
    GET /todos
 
 4. Filter todos:
    GET /todos?completed=false
    GET /todos?priority=3
+   GET /todos?include_archived=true
+
+   Sort and page with a cursor:
+   GET /todos?sort=-priority,created_at&limit=20
+   GET /todos?sort=-priority,created_at&limit=20&cursor={X-Next-Cursor}
 
 5. Get one todo:
    GET /todos/1
@@ -346,14 +732,46 @@ TEST YOUR API:
 8. Get stats:
    GET /todos/stats
 
+   GET /todos/analytics/timeseries?bucket=day
+   GET /todos/analytics/timeseries?bucket=hour&from=2026-01-01T00:00:00&to=2026-01-02T00:00:00
+
 9. Search:
    GET /todos/search?q=learn
+   GET /todos/search?q=lern&fuzzy=true
 
 10. Delete a todo:
     DELETE /todos/1
 
 11. Delete all completed:
     DELETE /todos/completed
+
+12. Incremental sync:
+    GET /todos/changes                  -> {"cursor": 7, ...}
+    GET /todos/changes?since=7&wait=30  -> waits for the next change
+    curl -N -H "Accept: text/event-stream" "http://127.0.0.1:8000/todos/changes?since=7"
+
+13. Offline sync:
+    POST /todos/sync
+    {"since": 0, "changes": [{"client_ref": "a", "title": "Made offline"}]}
+    POST /todos/sync
+    {"since": 4, "changes": [{"id": 1, "base_version": 3, "completed": true}]}
+
+14. Backups:
+    POST /admin/backup                  -> {"state": "running", ...}
+    GET /admin/backup                   -> {"state": "succeeded", "progress": 1.0, ...}
+
+15. Maintenance:
+    GET /admin/maintenance              -> last result of each task
+    POST /admin/maintenance             -> run them all now
+
+16. Batch (one transaction, one commit):
+    POST /batch
+    {"operations": [
+        {"method": "POST", "path": "/todos", "body": {"title": "Write report"}},
+        {"method": "POST", "path": "/todos/1/toggle"},
+        {"method": "DELETE", "path": "/todos/2"}
+    ]}
+    Add "mode": "best_effort" to keep the operations that succeed.
 """
 
 
@@ -373,14 +791,15 @@ Skills practiced:
 7. Error handling with HTTPException
 8. Using proper HTTP status codes
 
-Key SQLAlchemy patterns:
-- db.query(Model).all()           # Get all
-- db.query(Model).first()         # Get first
-- db.query(Model).filter(...)     # Filter
-- db.add(item)                    # Add new
-- db.commit()                     # Save changes
-- db.refresh(item)                # Reload from DB
-- db.delete(item)                 # Delete item
+Key SQLAlchemy patterns (2.0 style):
+- db.scalars(select(Model)).all()       # Get all
+- db.get(Model, id)                     # Get by primary key
+- select(Model).where(...)              # Filter
+- db.execute(delete(Model).where(...))  # Bulk delete
+- db.add(item)                          # Add new
+- db.commit()                           # Save changes
+- db.refresh(item)                      # Reload from DB
+- db.delete(item)                       # Delete item
 
 Next steps:
 - Add user authentication (JWT)
@@ -0,0 +1,189 @@
+"""
+DELTA SYNC
+===========
+Lets offline-first clients catch up without redownloading every todo.
+
+Every write stamps the todo with a new `version` taken from one global
+counter (SyncClock). Deletes leave a TodoTombstone with a version from
+the same counter. A client keeps the highest version it has seen as its
+sync token and asks for everything newer:
+
+    POST /todos/sync  {"since": 120, "changes": [...]}
+
+    -> {"todos": [...changed...], "tombstones": [...deleted ids...],
+        "token": 180, "has_more": false, "results": [...]}
+
+Local edits are pushed in the same call. Each one carries the version
+the client last saw (base_version); if the server copy has moved on in
+the meantime, the change is rejected as a conflict and the server copy
+is returned so the client can merge and retry.
+
+Versions are assigned in a before_flush hook, so every endpoint that
+changes todos through the session gets them for free. Bulk deletes that
+bypass the session must call record_tombstones() themselves.
+"""
+
+from typing import List
+
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+import changefeed
+from database import SessionLocal
+from models import SyncClock, Todo, TodoTombstone
+from schemas import (
+    TodoResponse, TodoSyncChange, TodoSyncResponse, TodoSyncResult, TodoTombstoneResponse
+)
+
+SYNCED_FIELDS = {"title", "description", "completed", "priority"}
+
+
+# ============================================
+# Version allocation
+# ============================================
+
+def allocate_versions(session: Session, count: int) -> int:
+    """Reserve `count` new versions and return the first one."""
+    last = session.connection().execute(
+        update(SyncClock)
+        .where(SyncClock.id == 1)
+        .values(value=SyncClock.value + count)
+        .returning(SyncClock.value)
+    ).scalar_one()
+    return last - count + 1
+
+
+def _write_tombstones(session: Session, todo_ids: List[int]):
+    if not todo_ids:
+        return
+    first = allocate_versions(session, len(todo_ids))
+    rows = [{"todo_id": todo_id, "version": first + i} for i, todo_id in enumerate(todo_ids)]
+    stmt = insert(TodoTombstone).values(rows)
+    # A reused id may already have a tombstone from an earlier delete
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TodoTombstone.todo_id],
+        set_={"version": stmt.excluded.version, "deleted_at": stmt.excluded.deleted_at}
+    )
+    session.connection().execute(stmt)
+
+
+def record_tombstones(db: Session, todo_ids: List[int]):
+    """Leave tombstones for todos removed with a bulk query.delete()."""
+    _write_tombstones(db, todo_ids)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _stamp_versions(session: Session, flush_context, instances):
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Todo) and (obj in session.new or session.is_modified(obj))
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Todo)]
+
+    if changed:
+        first = allocate_versions(session, len(changed))
+        for offset, todo in enumerate(changed):
+            todo.version = first + offset
+
+    _write_tombstones(session, deleted)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _clear_reused_tombstones(session: Session, flush_context):
+    # SQLite can hand a deleted todo's id to a new todo; the old
+    # tombstone must go or clients would delete the new row
+    new_ids = [obj.id for obj in session.new if isinstance(obj, Todo)]
+    if new_ids:
+        session.connection().execute(
+            TodoTombstone.__table__.delete().where(TodoTombstone.todo_id.in_(new_ids))
+        )
+
+
+# ============================================
+# Pull: changes since a token
+# ============================================
+
+def pull_changes(db: Session, since: int, limit: int) -> TodoSyncResponse:
+    """Return one page of todos and tombstones with version > since."""
+    # Everything at or below the committed clock value is already
+    # visible, so capping both queries at it gives a consistent page
+    # even if a writer commits between the two SELECTs
+    clock = db.scalar(select(SyncClock.value).where(SyncClock.id == 1)) or 0
+
+    todos = db.scalars(
+        select(Todo)
+        .where(Todo.version > since, Todo.version <= clock)
+        .order_by(Todo.version)
+        .limit(limit + 1)
+    ).all()
+    tombstones = db.scalars(
+        select(TodoTombstone)
+        .where(TodoTombstone.version > since, TodoTombstone.version <= clock)
+        .order_by(TodoTombstone.version)
+        .limit(limit + 1)
+    ).all()
+
+    merged = sorted(list(todos) + list(tombstones), key=lambda row: row.version)
+    has_more = len(merged) > limit
+    page = merged[:limit]
+
+    return TodoSyncResponse(
+        todos=[TodoResponse.model_validate(row) for row in page if isinstance(row, Todo)],
+        tombstones=[
+            TodoTombstoneResponse(id=row.todo_id, version=row.version)
+            for row in page if isinstance(row, TodoTombstone)
+        ],
+        token=page[-1].version if page else since,
+        has_more=has_more,
+    )
+
+
+# ============================================
+# Push: apply client changes
+# ============================================
+
+def _apply_one(db: Session, change: TodoSyncChange):
+    """Apply one change; returns (status, todo)."""
+    fields = change.model_dump(exclude_unset=True, include=SYNCED_FIELDS)
+
+    if change.id is None:
+        if change.deleted or not change.title:
+            return "invalid", None
+        todo = Todo(**fields)
+        db.add(todo)
+        changefeed.record_change(db, "insert", todo)
+        return "applied", todo
+
+    todo = db.get(Todo, change.id)
+    if todo is None:
+        return "not_found", None
+
+    if change.base_version != todo.version:
+        return "conflict", todo
+
+    if change.deleted:
+        changefeed.record_change(db, "delete", todo)
+        db.delete(todo)
+        return "applied", None
+
+    for field, value in fields.items():
+        setattr(todo, field, value)
+    changefeed.record_change(db, "update", todo)
+    return "applied", todo
+
+
+def apply_changes(db: Session, changes: List[TodoSyncChange]) -> List[TodoSyncResult]:
+    """Apply all pushed changes in one transaction."""
+    outcomes = [(change, *_apply_one(db, change)) for change in changes]
+    db.commit()
+
+    results = []
+    for change, status, todo in outcomes:
+        results.append(TodoSyncResult(
+            client_ref=change.client_ref,
+            id=todo.id if todo is not None else change.id,
+            status=status,
+            todo=TodoResponse.model_validate(todo) if todo is not None else None,
+        ))
+    return results
@@ -0,0 +1,137 @@
+"""
+THREADPOOL CAPACITY
+====================
+Sizing and instrumentation for the worker threads behind `def` endpoints.
+
+FastAPI runs every plain `def` endpoint (and `def` dependency, such as
+get_db) on AnyIO's worker threadpool. Out of the box that pool allows 40
+threads no matter how many database connections exist. Here it is sized
+to DB_POOL_SIZE instead, so a thread that gets to run can always get a
+connection.
+
+Metrics exported on GET /metrics:
+    threadpool_queue_wait_seconds   time from request arrival to a worker thread
+    threadpool_active_threads       threads currently busy
+    threadpool_waiting_tasks        calls queued for a free thread
+    threadpool_saturation           active / capacity (1.0 = every thread busy)
+    db_query_seconds                time spent inside SQL statements
+    db_pool_checked_out             connections currently in use
+    db_compiled_cache_total         statements by compiled-cache outcome
+    db_compiled_cache_hit_ratio     hits / (hits + misses)
+
+If requests are slow and queue wait is high while query time is low,
+the bottleneck is threads, not the database.
+"""
+
+import os
+import time
+
+import anyio.to_thread
+from fastapi import Request
+from sqlalchemy import event
+
+from database import DB_POOL_SIZE, engine
+from metrics import Counter, Gauge, Histogram
+
+# Worker threads for `def` endpoints (defaults to the DB pool size)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", str(DB_POOL_SIZE)))
+
+_limiter = None
+
+
+def configure_threadpool(size: int = THREADPOOL_SIZE):
+    """Resize AnyIO's default thread limiter. Call from the app's lifespan."""
+    global _limiter
+    _limiter = anyio.to_thread.current_default_thread_limiter()
+    _limiter.total_tokens = size
+
+
+# ============================================
+# Threadpool metrics
+# ============================================
+
+queue_wait = Histogram(
+    "threadpool_queue_wait_seconds", "Time a request waited for a worker thread"
+)
+
+
+def _borrowed() -> float:
+    return _limiter.borrowed_tokens if _limiter else 0
+
+
+Gauge("threadpool_capacity", "Worker threads available",
+      callback=lambda: _limiter.total_tokens if _limiter else THREADPOOL_SIZE)
+Gauge("threadpool_active_threads", "Worker threads currently busy", callback=_borrowed)
+Gauge("threadpool_waiting_tasks", "Calls queued for a free worker thread",
+      callback=lambda: _limiter.statistics().tasks_waiting if _limiter else 0)
+Gauge("threadpool_saturation", "Busy threads divided by capacity",
+      callback=lambda: _borrowed() / _limiter.total_tokens if _limiter else 0)
+
+
+class ThreadpoolWaitMiddleware:
+    """ASGI middleware that stamps each request with its arrival time."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope["arrived_at"] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+
+def track_threadpool_wait(request: Request):
+    """
+    Global `def` dependency: runs on a worker thread, so the time since
+    arrival is roughly how long the request queued for that thread.
+    """
+    arrived_at = request.scope.get("arrived_at")
+    if arrived_at is not None:
+        queue_wait.observe(time.perf_counter() - arrived_at)
+
+
+# ============================================
+# Database metrics
+# ============================================
+
+query_time = Histogram("db_query_seconds", "Time spent executing SQL statements")
+
+Gauge("db_pool_checked_out", "Database connections currently in use",
+      callback=lambda: engine.pool.checkedout())
+
+# Outcome of SQLAlchemy's compiled-statement cache lookup for each query:
+# cache_hit, cache_miss, caching_disabled or no_cache_key
+compiled_cache = Counter(
+    "db_compiled_cache_total", "Statements executed, by compiled-cache outcome", ["result"]
+)
+
+
+def _cache_hit_ratio() -> float:
+    hits = compiled_cache.get(result="cache_hit")
+    misses = compiled_cache.get(result="cache_miss")
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+Gauge("db_compiled_cache_hit_ratio", "Share of statements served from the compiled cache",
+      callback=_cache_hit_ratio)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    query_time.observe(time.perf_counter() - conn.info["query_started"].pop())
+    if context is not None:
+        compiled_cache.inc(result=context.cache_hit.name.lower())
+
+
+@event.listens_for(engine, "handle_error")
+def _query_failed(context):
+    # after_cursor_execute never fires for a failed statement
+    if context.connection is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()